@@ -1,18 +1,51 @@
 """
 Bard.py
-The Player Engine (Single-Thread Focus).
-v19.1: SMART HAND HOTFIX.
-       - Fixed: Filtered 'None' values from key lists to prevent crashes on REST instructions.
-       - Retains 'Modifier Latching' from v19.0.
-Last Update: 2025-11-23 15:15 EST
+The Player Engine.
+v21.0: PLAYLIST.
+       - Queue several songs (menu 'P'): each one is loaded on a background thread while the
+         one before it plays, then starts --gap beats after its last beat with no countdown.
+       - --shuffle and --repeat work on the queue picked from the menu, never re-reading the library.
+       - --tempo compiles the song at that speed: beat onsets scale, taps and modifier leads keep
+         their real-time lengths. It is set when a song starts, not changed while it plays.
+v20.9: PRE-ROLL.
+       - The song is loaded, compiled, seeked, calibrated and warmed up on a background
+         thread during the countdown; playback starts as soon as it ends.
+v20.8: THREADED ENGINE.
+       - Scheduler, key injector, ESC watcher and progress display run on separate threads.
+       - The injector never prints or polls the keyboard; a stop wakes its sleep immediately.
+v20.7: SEEK & RESUME.
+       - Play from any position or section marker: binary search over the Program's event
+         times, with the modifiers held at that point pressed again before resuming.
+       - ESC leaves a resume point in the menu, kept at the tempo the song was playing at.
+       - --tempo is compiled in when a song starts (see v21.0), not changed during playback.
+v20.6: LOAD-TIME COMPILER.
+       - Songs are compiled into press/release events with absolute target times (v20.0).
+       - Hybrid sleep/spin scheduler on perf_counter_ns with wake-up error reporting (v20.1).
+       - INPUT arrays for every key group are built at load time; a chord goes down/up in one SendInput call (v20.2).
+       - RecordingBackend runs the same injection path off Windows for benchmarking.
+       - Opt-in timing telemetry (--trace) writes per-event lateness and jitter percentiles to traces/ (v20.2).
+       - Plays compact .bard songs from a memory map (preferred over JSON when both exist) (v20.3).
+       - Menu reads titles/lengths from the cached library index (SongLibrary.py) instead of parsing every song (v20.4).
+       - Multi-track songs play every track, merged into one schedule (SongFormat.merge_tracks) (v20.5).
+       - Songs are validated once at load and lowered into a compact Program; bad notes or
+         malformed instructions are reported up front instead of being skipped mid-song.
+       - Retains 'Modifier Latching' from v19.0 and REST safety from v19.1.
+Last Update: 2026-10-17
 """
 import time
 import ctypes
-import msvcrt
 import os
+import sys
 import json
-import glob
 import random
+import argparse
+import threading
+import queue
+from array import array
+from bisect import bisect_left
+
+import SongFormat
+import SongLibrary
 
 # ==========================================
 # CONFIGURATION
@@ -25,13 +58,48 @@ SONGS_DIR = "songs"
 # === TIMING SETTINGS ===
 HUMANIZE_TIMING = True  
 TIMING_VARIANCE = 0.002 
-PRESS_DURATION = 0.03   # Short reliable tap
-MOD_LEAD_TIME = 0.05    # Time to hold Shift before pressing note
+PRESS_DURATION = SongFormat.PRESS_DURATION   # Shared with the Songwriter's playability checks
+MOD_LEAD_TIME = SongFormat.MOD_LEAD_TIME
+
+# === SCHEDULER SETTINGS ===
+SPIN_THRESHOLD_NS = 2_000_000   # Stop sleeping this close to a deadline and spin
+STOP_POLL_NS = 20_000_000       # How often the coarse phase checks ESC
+FINE_WAIT_MODE = "spin"         # 'spin' (busy-wait) or 'yield' (sleep(0) between reads)
+
+# === THREAD SETTINGS ===
+SCHEDULE_CHUNK = 64             # Events per hand-off from the scheduler to the injector
+SCHEDULE_QUEUE_CHUNKS = 8       # Bounded queue depth between them
+STOP_WATCH_SEC = 0.005          # How often the watcher thread checks ESC
+UI_REFRESH_SEC = 0.1            # Progress line redraw interval
+
+# === PRE-ROLL SETTINGS ===
+WARMUP_WAITS = 8                # Short waits run through HybridWaiter during pre-roll
+WARMUP_WAIT_NS = 3_000_000      # Length of each (long enough to hit both phases)
+
+# === PLAYLIST SETTINGS ===
+PLAYLIST_GAP_BEATS = 4.0        # Silence between songs, in beats of the song that just ended
+PRELOAD_SWITCH_SEC = 0.0005     # GIL switch interval while a song preloads next to the injector
+
+# === TELEMETRY SETTINGS ===
+TRACE_ENABLED = False           # Same as running with --trace
+TRACE_DIR = "traces"
+TRACE_SECTION_SEC = SongFormat.TRACE_SECTION_SEC
+MISSED_DEADLINE_NS = 5_000_000  # Events later than this count as missed
 
 # ==========================================
 # DIRECT INPUT SETUP
 # ==========================================
-SendInput = ctypes.windll.user32.SendInput
+IS_WINDOWS = os.name == 'nt'
+if IS_WINDOWS:
+    import msvcrt
+    user32 = ctypes.windll.user32
+    GetAsyncKeyState = user32.GetAsyncKeyState
+else:
+    # Off Windows only the recording backend is usable (benchmarks, dry runs).
+    msvcrt = None
+    user32 = None
+    def GetAsyncKeyState(vk): return 0
+
 PUL = ctypes.POINTER(ctypes.c_ulong)
 class KeyBdInput(ctypes.Structure):
     _fields_ = [("wVk", ctypes.c_ushort), ("wScan", ctypes.c_ushort), ("dwFlags", ctypes.c_ulong), ("time", ctypes.c_ulong), ("dwExtraInfo", PUL)]
@@ -44,21 +112,72 @@ class Input_I(ctypes.Union):
 class Input(ctypes.Structure):
     _fields_ = [("type", ctypes.c_ulong), ("ii", Input_I)]
 
-def PressKey(hexKeyCode):
-    if hexKeyCode is None: return
-    extra = ctypes.c_ulong(0)
-    ii_ = Input_I()
-    ii_.ki = KeyBdInput(0, hexKeyCode, 0x0008, 0, ctypes.pointer(extra))
-    x = Input(ctypes.c_ulong(1), ii_)
-    ctypes.windll.user32.SendInput(1, ctypes.pointer(x), ctypes.sizeof(x))
-
-def ReleaseKey(hexKeyCode):
-    if hexKeyCode is None: return
-    extra = ctypes.c_ulong(0)
-    ii_ = Input_I()
-    ii_.ki = KeyBdInput(0, hexKeyCode, 0x0008 | 0x0002, 0, ctypes.pointer(extra))
-    x = Input(ctypes.c_ulong(1), ii_)
-    ctypes.windll.user32.SendInput(1, ctypes.pointer(x), ctypes.sizeof(x))
+INPUT_KEYBOARD = 1
+KEYEVENTF_SCANCODE = 0x0008
+KEYEVENTF_KEYUP = 0x0002
+INPUT_SIZE = ctypes.sizeof(Input)
+
+def build_input_array(codes, flags):
+    """Builds a contiguous INPUT[] for a key group, ready to hand to SendInput in one call."""
+    arr = (Input * len(codes))()
+    for slot, code in zip(arr, codes):
+        slot.type = INPUT_KEYBOARD
+        slot.ii.ki = KeyBdInput(0, code, flags, 0, None)
+    return arr
+
+class InputBackend:
+    """
+    Injects key groups (chords, modifiers) through a SendInput-compatible callable.
+    prepare() builds the down/up INPUT arrays for every group up front, so a chord
+    goes out as a single batched call with no allocation at fire time.
+    """
+    def __init__(self, send):
+        self.send = send
+        self.down = {}
+        self.up = {}
+
+    def prepare(self, groups):
+        for codes in groups:
+            if codes in self.down: continue
+            self.down[codes] = build_input_array(codes, KEYEVENTF_SCANCODE)
+            self.up[codes] = build_input_array(codes, KEYEVENTF_SCANCODE | KEYEVENTF_KEYUP)
+
+    def press(self, codes):
+        if codes not in self.down: self.prepare((codes,))
+        arr = self.down[codes]
+        self.send(len(arr), arr, INPUT_SIZE)
+
+    def release(self, codes):
+        if codes not in self.up: self.prepare((codes,))
+        arr = self.up[codes]
+        self.send(len(arr), arr, INPUT_SIZE)
+
+class SendInputBackend(InputBackend):
+    """The real thing: user32.SendInput, looked up once."""
+    def __init__(self):
+        send = user32.SendInput
+        send.argtypes = [ctypes.c_uint, ctypes.POINTER(Input), ctypes.c_int]
+        send.restype = ctypes.c_uint
+        super().__init__(send)
+
+class RecordingBackend(InputBackend):
+    """
+    Null backend for non-Windows runs and benchmarks. Goes through the same prepared
+    INPUT arrays as SendInputBackend and records (timestamp_ns, scan codes, key_up) per call.
+    """
+    def __init__(self, clock=time.perf_counter_ns):
+        self.clock = clock
+        self.calls = []
+        super().__init__(self._record)
+
+    def _record(self, count, arr, size):
+        codes = tuple(arr[j].ii.ki.wScan for j in range(count))
+        key_up = bool(arr[0].ii.ki.dwFlags & KEYEVENTF_KEYUP)
+        self.calls.append((self.clock(), codes, key_up))
+        return count
+
+def default_backend():
+    return SendInputBackend() if IS_WINDOWS else RecordingBackend()
 
 KEYS = {
     "L1": 0x2C, "L2": 0x2D, "L3": 0x2E, "L4": 0x2F, "L5": 0x30, "L6": 0x31, "L7": 0x32,
@@ -66,135 +185,759 @@ KEYS = {
     "H1": 0x10, "H2": 0x11, "H3": 0x12, "H4": 0x13, "H5": 0x14, "H6": 0x15, "H7": 0x16,
     "SHIFT": 0x2A, "CTRL": 0x1D, "REST": None
 }
+MODIFIER_CODES = {KEYS["SHIFT"], KEYS["CTRL"]}
+MODIFIER_BITS = {KEYS["SHIFT"]: 1, KEYS["CTRL"]: 2}     # Held-modifier state as a bitmask
 
 def format_time(seconds):
     m = int(seconds // 60)
     s = int(seconds % 60)
     return f"{m:02d}:{s:02d}"
 
-def interruptible_sleep(duration):
-    if duration <= 0: return False
-    end_time = time.time() + duration
-    while time.time() < end_time:
-        if ctypes.windll.user32.GetAsyncKeyState(VK_ESCAPE) & 0x8000:
-            return True
-        sleep_chunk = min(0.02, end_time - time.time())
-        if sleep_chunk > 0:
-            time.sleep(sleep_chunk)
-    return False
+# ==========================================
+# SCHEDULER
+# ==========================================
+# Waiting is split in two phases. The coarse phase sleeps in short chunks and
+# polls the stop key between them. Once the deadline is within the spin
+# threshold, the fine phase watches only the clock (busy-wait or yield), so the
+# ESC check costs nothing right before a note fires.
+
+def esc_pressed():
+    return bool(GetAsyncKeyState(VK_ESCAPE) & 0x8000)
+
+class HybridWaiter:
+    """
+    Waits for absolute time.perf_counter_ns() deadlines.
+    clock, sleep and stop_check are injectable so the waiter can be driven by a fake clock.
+    fine_mode is 'spin' (pure busy-wait) or 'yield' (time.sleep(0) between clock reads).
+    With a stop_event (threading.Event) the coarse phase sleeps on the event itself, so
+    a stop set by another thread wakes it at once instead of at the next poll.
+    """
+    def __init__(self, clock=time.perf_counter_ns, sleep=time.sleep, stop_check=esc_pressed,
+                 spin_ns=SPIN_THRESHOLD_NS, poll_ns=STOP_POLL_NS, fine_mode=FINE_WAIT_MODE, stop_event=None):
+        if stop_event is not None: sleep, stop_check = stop_event.wait, stop_event.is_set
+        self.clock = clock
+        self.sleep = sleep
+        self.stop_check = stop_check
+        self.stop_event = stop_event
+        self.spin_ns = spin_ns
+        self.poll_ns = poll_ns
+        self.fine_mode = fine_mode
+        self.last_poll = 0
+        self.last_error = 0
+
+    def calibrate(self, samples=20):
+        """Measures how far a 1 ms sleep overshoots and widens the spin threshold to cover it."""
+        overshoots = []
+        for _ in range(samples):
+            t0 = self.clock()
+            self.sleep(0.001)
+            overshoots.append(self.clock() - t0 - 1_000_000)
+        overshoots.sort()
+        worst = overshoots[int(len(overshoots) * 0.9)]
+        self.spin_ns = max(SPIN_THRESHOLD_NS, int(worst * 1.5) + 1_000_000)
+        return self.spin_ns
+
+    def should_stop(self, now):
+        if self.stop_event is not None: return self.stop_event.is_set()
+        if now - self.last_poll < self.poll_ns: return False
+        self.last_poll = now
+        return self.stop_check()
+
+    def wait_until(self, deadline):
+        """
+        Blocks until deadline (ns). Returns True if the stop key was seen.
+        The wake-up error (actual - deadline, in ns) is left in last_error.
+        """
+        clock = self.clock
+        now = clock()
+
+        # Coarse phase: sleep in chunks, polling the stop key between them
+        while deadline - now > self.spin_ns:
+            if self.should_stop(now): return True
+            chunk = deadline - now - self.spin_ns
+            if self.stop_event is None: chunk = min(self.poll_ns, chunk)
+            self.sleep(chunk / 1e9)
+            now = clock()
+
+        # Already late: still honour ESC at the poll rate so a dragging song can be stopped
+        if now >= deadline and self.should_stop(now): return True
+
+        # Fine phase: clock only
+        if self.fine_mode == 'yield':
+            sleep = self.sleep
+            while now < deadline:
+                sleep(0)
+                now = clock()
+        else:
+            while now < deadline:
+                now = clock()
+
+        self.last_error = now - deadline
+        return False
 
 # ==========================================
-# PLAYER ENGINE
+# TIMELINE COMPILER
 # ==========================================
+# Every instruction is lowered into absolute press/release events measured
+# from the start of the song. The player fires each event against a
+# monotonic clock, so lateness is corrected at every event instead of
+# accumulating note after note.
+
+EV_PRESS = 0
+EV_RELEASE = 1
+
+class SongError(Exception):
+    """A song that failed validation at load time."""
+
+def json_steps(notes, problems):
+    """Validates JSON instructions and yields (key_codes, modifier, duration); bad ones go to problems."""
+    for i, instruction in enumerate(notes):
+        try:
+            notes_raw, mod_req, duration, count = SongFormat.check_instruction(instruction)
+        except ValueError as e:
+            problems.append(f"instruction {i}: {e}")
+            continue
+        # --- FIX v19.1: Filter None values (Rests) ---
+        step = tuple(KEYS[n] for n in notes_raw if KEYS[n] is not None), mod_req, duration
+        for _ in range(count): yield step
+
+def binary_steps(song, problems):
+    """Yields (key_codes, modifier, duration) straight from a mapped .bard file, then closes it."""
+    codes_for = {}
+    modifiers = SongFormat.MODIFIERS
+    with song:
+        for i, (mask, mod, duration) in enumerate(song.records()):
+            if mask >> len(SongFormat.NOTE_BITS) or mod >= len(modifiers) or not duration >= 0:
+                problems.append(f"record {i}: bad mask/modifier/duration {(mask, mod, duration)}")
+                continue
+            codes = codes_for.get(mask)
+            if codes is None:
+                codes = codes_for[mask] = tuple(KEYS[n] for n in SongFormat.mask_to_notes(mask) if KEYS[n] is not None)
+            yield codes, modifiers[mod], duration
+
+class Program:
+    """
+    A song lowered for playback: event targets (ns from song start), actions and key
+    groups as parallel sequences. Equal key groups share one interned tuple.
+    The sorted targets double as the seek index, and modifier_state records which
+    modifiers are held before each event, so playback can start anywhere.
+    Targets are in real time at the tempo the song was compiled for; duration, markers and
+    positions stay in song time (tempo 1).
+    """
+    def __init__(self, title, bpm, duration, timeline, markers=(), tempo=1.0):
+        interned = {}
+        self.title = title
+        self.bpm = bpm
+        self.duration = duration
+        self.tempo = tempo
+        self.markers = [(name, beat * (60.0 / bpm)) for name, beat in markers]
+        self.targets = array('q', (target for target, _, _ in timeline))
+        self.actions = bytes(action for _, action, _ in timeline)
+        self.groups = tuple(interned.setdefault(codes, codes) for _, _, codes in timeline)
+        self.key_groups = tuple(interned)
+
+        state = 0
+        held = bytearray(len(timeline))
+        for i, (_, action, codes) in enumerate(timeline):
+            held[i] = state
+            for code in codes:
+                bit = MODIFIER_BITS.get(code)
+                if bit: state = state | bit if action == EV_PRESS else state & ~bit
+        self.modifier_state = bytes(held)
+
+    def __len__(self): return len(self.targets)
+
+    def events(self): return zip(self.targets, self.actions, self.groups)
+
+    def index_at(self, seconds):
+        """First event at or after a song position. The 1 us slack absorbs float rounding in the targets."""
+        return bisect_left(self.targets, int((seconds / self.tempo + MOD_LEAD_TIME) * 1e9) - 1000)
+
+    def position(self, index):
+        """Song position (s) of an event index, rounded to the microsecond so whole seconds show as such."""
+        if index >= len(self): return self.duration
+        return round(max(0.0, (self.targets[index] / 1e9 - MOD_LEAD_TIME) * self.tempo), 6)
 
-def get_song_duration(notes, bpm):
-    total_beats = sum(instruction[-1] for instruction in notes)
-    return total_beats * (60.0 / bpm)
+    def held_modifiers(self, index):
+        """Modifier codes that are down just before event index."""
+        state = self.modifier_state[index] if index < len(self) else 0
+        return tuple(code for code, bit in MODIFIER_BITS.items() if state & bit)
 
-def play_song_from_file(filepath):
+    def seek(self, position):
+        """Event index for a position in seconds or a section marker name (case-insensitive)."""
+        if isinstance(position, str):
+            for name, seconds in self.markers:
+                if name.lower() == position.strip().lower(): return self.index_at(seconds)
+            names = ", ".join(name for name, _ in self.markers) or "none"
+            raise SongError(f"no section '{position}' in {self.title} (sections: {names})")
+        return self.index_at(min(max(position, 0.0), self.duration))
+
+def compile_song(filepath, tempo=1.0):
+    """
+    Loads a .json or .bard song, validates every instruction once and lowers it into a
+    Program. Raises SongError listing the problems instead of skipping them mid-song.
+    tempo scales the beat onsets only: taps and modifier leads keep their real-time
+    lengths (and are squeezed by the same rules) at any speed.
+    """
+    problems = []
     try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        if filepath.endswith(SongFormat.BINARY_EXT):
+            song = SongFormat.BinarySong(filepath)
+            title, bpm, markers = song.title, song.bpm, song.markers
+            steps = binary_steps(song, problems)
+        else:
+            with open(filepath, 'r') as f:
+                data = json.load(f)
+            if 'notes' not in data and 'tracks' not in data: raise SongError(f"{filepath}: no 'notes' or 'tracks'")
+            title = data.get('title', 'Unknown')
+            bpm = data.get("bpm", 120)
+            if isinstance(bpm, bool) or not isinstance(bpm, (int, float)) or bpm <= 0: raise SongError(f"{filepath}: bad bpm {bpm!r}")
+            markers = SongFormat.check_markers(data.get('markers'))
+            steps = json_steps(SongFormat.song_notes(data), problems)
+        timeline, duration = build_timeline(steps, bpm * tempo)
+    except SongError:
+        raise
     except Exception as e:
-        print(f"Error: {e}")
-        return
+        raise SongError(f"{filepath}: {e}") from e
+
+    if problems:
+        shown = "\n    ".join(problems[:10])
+        more = f"\n    ... and {len(problems) - 10} more" if len(problems) > 10 else ""
+        raise SongError(f"{filepath}: {len(problems)} invalid instruction(s)\n    {shown}{more}")
+    return Program(title, bpm, round(duration * tempo, 6), timeline, markers, tempo)
+
+def build_timeline(steps, bpm):
+    """
+    Compiles (key_codes, modifier, duration) steps into a flat list of (target_ns, action, key_codes) events.
+    target_ns is in nanoseconds from the start of the song. The origin is offset by
+    MOD_LEAD_TIME so an opening modifier still gets its full lead.
+    Returns (events, song length in seconds).
+    """
+    seconds_per_beat = 60.0 / bpm
+    timeline = []
+    active_modifier = None
+    beat_time = MOD_LEAD_TIME
+    last_event = 0.0
+
+    steps = iter(steps)
+    current = next(steps, None)
+    while current is not None:
+        following = next(steps, None)
+        keys_to_press, mod_req, duration = current
+
+        step = duration * seconds_per_beat
+        next_beat_time = beat_time + step
+
+        note_time = beat_time
+        if HUMANIZE_TIMING: note_time += random.uniform(0, TIMING_VARIANCE)
+
+        # --- 1. MODIFIER MANAGEMENT (LATCHING) ---
+        mod_code = KEYS.get(mod_req) if mod_req else None
+
+        if active_modifier != mod_req:
+            if mod_req and mod_code:
+                # Lead the note by MOD_LEAD_TIME, but never before the previous release.
+                lead_time = max(note_time - MOD_LEAD_TIME, last_event)
+                timeline.append((int(lead_time * 1e9), EV_PRESS, (mod_code,)))
+                last_event = lead_time
+            active_modifier = mod_req
+
+        # --- 2. NOTE PLAYBACK ---
+        note_time = max(note_time, last_event)
+        release_time = note_time
+
+        if keys_to_press:
+            # A tap can't outlast its own slot, otherwise it would swallow the next strike.
+            release_time = max(note_time, min(note_time + PRESS_DURATION, next_beat_time))
+            timeline.append((int(note_time * 1e9), EV_PRESS, keys_to_press))
+            timeline.append((int(release_time * 1e9), EV_RELEASE, keys_to_press))
+            last_event = release_time
+
+        # --- 3. LOOKAHEAD STRATEGY ---
+        next_mod = following[1] if following is not None else None
+
+        if active_modifier and next_mod != active_modifier:
+            if mod_code:
+                timeline.append((int(release_time * 1e9), EV_RELEASE, (mod_code,)))
+                last_event = release_time
+            active_modifier = None
+
+        beat_time = next_beat_time
+        current = following
+
+    return coalesce_events(timeline), round(beat_time - MOD_LEAD_TIME, 6)     # To the microsecond, like Program.position
+
+def coalesce_events(timeline):
+    """
+    Merges back-to-back events with the same target and action into one key group,
+    e.g. a modifier whose lead collapsed onto its note, so they share one SendInput call.
+    """
+    merged = []
+    for event in timeline:
+        if merged:
+            target, action, codes = merged[-1]
+            if event[0] == target and event[1] == action:
+                merged[-1] = (target, action, codes + event[2])
+                continue
+        merged.append(event)
+    return merged
+
+# ==========================================
+# PLAYBACK THREADS
+# ==========================================
+# A song plays on four threads so console I/O and key polling never sit
+# between the injector and its next deadline:
+#   scheduler - turns Program events into deadline offsets and
+#               hands them over in chunks through a bounded queue
+#   injector  - the calling thread; waits for each deadline and sends the keys
+#   watcher   - polls ESC and sets the stop event, which also wakes the
+#               injector out of its coarse sleep at once
+#   ui        - redraws the progress line UI_REFRESH_SEC apart
+# Only the injector touches the keyboard; the others wait on events or the
+# queue and hold the GIL for a few microseconds at a time.
+
+class PlaybackState:
+    """Shared by the playback threads. index is written by the injector only."""
+    def __init__(self, start_index=0, stop=None):
+        self.index = start_index
+        self.stop = stop if stop is not None else threading.Event()
+        self.done = threading.Event()
+
+def schedule_events(program, start_index, feed, state):
+    """Scheduler thread: queues (index, offset_ns, action, codes) chunks, then None."""
+    targets = program.targets
+    base = targets[start_index] if 0 < start_index < len(program) else 0
+
+    def put(item):
+        while not state.stop.is_set():
+            try:
+                feed.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    chunk = []
+    for i in range(start_index, len(program)):
+        chunk.append((i, targets[i] - base, program.actions[i], program.groups[i]))
+        if len(chunk) == SCHEDULE_CHUNK:
+            if not put(chunk): return
+            chunk = []
+    if chunk and not put(chunk): return
+    put(None)
+
+def watch_stop_key(state):
+    """Watcher thread: sets state.stop when ESC goes down, until the song is done."""
+    while not state.done.wait(STOP_WATCH_SEC):
+        if esc_pressed():
+            state.stop.set()
+            return
 
-    title = data.get('title', 'Unknown')
-    bpm = data.get("bpm", 120)
-    
-    if 'notes' in data: notes = data.get('notes', [])
-    elif 'tracks' in data: notes = data['tracks'].get('Lead_Melody', [])
-    else: return
+def render_progress(program, state):
+    """UI thread: redraws the progress line when the shown position changes."""
+    timer_total = format_time(program.duration)
+    shown = None
+    while True:
+        finished = state.done.wait(UI_REFRESH_SEC)
+        text = f"\rPlaying... [{format_time(program.position(state.index))} / {timer_total}]   "
+        if text != shown and not finished:
+            print(text, end="", flush=True)
+            shown = text
+        if finished: return
+
+def drain(feed):
+    while True:
+        chunk = feed.get()
+        if chunk is None: return
+        yield from chunk
+
+def play_program(program, waiter=None, backend=None, telemetry=None, start_index=0, stop=None, origin=None):
+    """
+    Plays program events from start_index on and returns the index of the first event not
+    played (len(program) if the song completed). The calling thread is the injector; the
+    scheduler, ESC watcher and progress display run on their own threads (see above).
+    stop is the threading.Event that ends playback; pass the one the waiter sleeps on.
+    Modifiers held at start_index are pressed first, MOD_LEAD_TIME ahead of the first event.
+    The tempo is the one the Program was compiled for (see compile_song).
+    origin is the waiter-clock time (ns) the song's timeline starts at; default: now.
+    Prints the mean/max wake-up error when the song completes.
+    If a Telemetry is given, the actual issue time of every event is stored in it.
+    """
+    state = PlaybackState(start_index, stop)
+    if waiter is None: waiter = HybridWaiter(stop_event=state.stop)
+    if backend is None: backend = default_backend()
+    press = backend.press
+    release = backend.release
+    held = set()
+    error_sum = 0
+    error_max = 0
+    clock = waiter.clock
+    stopped = state.stop.is_set
+    issued = telemetry.actual if telemetry else None
+    if telemetry: telemetry.first = telemetry.count = start_index
+    base = program.targets[start_index] if 0 < start_index < len(program) else 0
+
+    feed = queue.Queue(maxsize=SCHEDULE_QUEUE_CHUNKS)
+    threads = [threading.Thread(target=schedule_events, args=(program, start_index, feed, state), daemon=True),
+               threading.Thread(target=watch_stop_key, args=(state,), daemon=True),
+               threading.Thread(target=render_progress, args=(program, state), daemon=True)]
+    for thread in threads: thread.start()
+
+    restore = program.held_modifiers(start_index)
+    if origin is None: origin = clock() + (int(MOD_LEAD_TIME * 1e9) if restore else 0)
+    if restore:
+        press(restore)
+        held.update(restore)
+
+    stopped_at = len(program)
+    try:
+        for i, offset, action, codes in drain(feed):
+            if waiter.wait_until(origin + offset) or stopped():
+                stopped_at = i
+                break
+
+            if issued is not None:
+                issued[i] = base + clock() - origin
+                telemetry.count = i + 1
+
+            if action == EV_PRESS:
+                press(codes)
+                held.update(codes)
+            else:
+                release(codes)
+                held.difference_update(codes)
+            state.index = i
+
+            error = waiter.last_error
+            error_sum += error
+            if error > error_max: error_max = error
+    finally:
+        if held: release(tuple(held))
+        state.stop.set()
+        state.done.set()
+        for thread in threads: thread.join()
+
+    if stopped_at < len(program):
+        print("\n[!] Music stopped by user.")
+        return stopped_at
+
+    played = len(program) - start_index
+    if played > 0:
+        print(f"\r[i] Wake-up error: mean {error_sum / played / 1e3:.0f} us, max {error_max / 1e3:.0f} us          ")
+    return stopped_at
+
+# ==========================================
+# TELEMETRY
+# ==========================================
+
+class Telemetry:
+    """
+    Opt-in timing record for one song. Planned and actual issue times (ns from song start)
+    live in preallocated arrays, so recording an event is a single store in the hot loop.
+    """
+    def __init__(self, program):
+        self.planned = program.targets
+        self.actual = array('q', bytes(8 * len(program)))
+        self.actions = program.actions
+        self.first = 0      # Index of the first recorded event (non-zero after a seek)
+        self.count = 0
+
+    def lateness(self):
+        """Lateness (ns) of the recorded events, from index first up to count."""
+        return [self.actual[i] - self.planned[i] for i in range(self.first, self.count)]
+
+def jitter_summary(lateness):
+    """p50/p95/p99/max/mean of a list of lateness values (ns), reported in microseconds."""
+    if not lateness: return {"events": 0}
+    ordered = sorted(lateness)
+    n = len(ordered)
+    def pct(p): return ordered[min(n - 1, int(p * n))] / 1e3
+    return {
+        "events": n,
+        "p50_us": pct(0.50),
+        "p95_us": pct(0.95),
+        "p99_us": pct(0.99),
+        "max_us": ordered[-1] / 1e3,
+        "mean_us": sum(ordered) / n / 1e3,
+        "missed": sum(1 for v in ordered if v > MISSED_DEADLINE_NS),
+    }
+
+def section_windows(program):
+    """
+    The song's section markers as (start_ns, name) pairs, with anything before the first
+    one as a lead-in window. Songs without markers get fixed TRACE_SECTION_SEC windows.
+    """
+    if not program.markers:
+        step = int(TRACE_SECTION_SEC * 1e9)
+        total_ns = program.targets[-1] if len(program) else 0
+        return [(s, f"{format_time(s / 1e9)}-{format_time((s + step) / 1e9)}") for s in range(0, max(total_ns, 1), step)]
+    markers = sorted(program.markers, key=lambda marker: marker[1])
+    windows = [(int((seconds / program.tempo + MOD_LEAD_TIME) * 1e9), name) for name, seconds in markers]
+    if markers[0][1] > 0: windows.insert(0, (0, f"{format_time(0)}-{format_time(markers[0][1])}"))
+    return [(0, windows[0][1])] + windows[1:]
+
+def write_trace(telemetry, title, filepath, sections):
+    """Dumps the recorded events plus jitter summaries to TRACE_DIR and returns the trace path."""
+    if not os.path.exists(TRACE_DIR): os.makedirs(TRACE_DIR)
+    lateness = telemetry.lateness()
+
+    first = telemetry.first
+    per_section = []
+    bounds = [start for start, _ in sections] + [float('inf')]
+    for s, (start, name) in enumerate(sections):
+        values = [v for i, v in enumerate(lateness, first) if bounds[s] <= telemetry.planned[i] < bounds[s + 1]]
+        per_section.append({"section": name, **jitter_summary(values)})
+
+    summary = jitter_summary(lateness)
+    report = {
+        "title": title,
+        "song": filepath,
+        "recorded": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "completed": telemetry.count == len(telemetry.planned),
+        "first_event": first,
+        "settings": {"PRESS_DURATION": PRESS_DURATION, "MOD_LEAD_TIME": MOD_LEAD_TIME,
+                     "SPIN_THRESHOLD_NS": SPIN_THRESHOLD_NS, "FINE_WAIT_MODE": FINE_WAIT_MODE,
+                     "MISSED_DEADLINE_NS": MISSED_DEADLINE_NS},
+        "summary": summary,
+        "sections": per_section,
+        # planned_ns, actual_ns, lateness_ns, action (0 = press, 1 = release)
+        "events": [[telemetry.planned[i], telemetry.actual[i], lateness[i - first], telemetry.actions[i]] for i in range(first, telemetry.count)],
+    }
+
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    trace_path = os.path.join(TRACE_DIR, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(trace_path, 'w') as f:
+        json.dump(report, f)
+
+    if summary["events"]:
+        print(f"[i] Jitter: p50 {summary['p50_us']:.0f} us | p95 {summary['p95_us']:.0f} us | "
+              f"p99 {summary['p99_us']:.0f} us | max {summary['max_us']:.0f} us | missed {summary['missed']}")
+    print(f"[i] Trace written: {trace_path}")
+    return trace_path
+
+# ==========================================
+# PRE-ROLL
+# ==========================================
+# Everything a song needs before its first note is done on a background
+# thread while the countdown is on screen, so the countdown's last second
+# hands straight over to the injector.
+
+class PreRoll(threading.Thread):
+    """
+    Loads and compiles a song, seeks to start, prepares the INPUT arrays, calibrates the
+    waiter and warms up the playback path. error holds the SongError if loading failed;
+    elapsed is the pre-roll time in seconds.
+    With spin_ns (from an earlier calibration) the calibration and warm-up waits are
+    skipped, so a song can be preloaded while another one is playing.
+    """
+    def __init__(self, filepath, trace=TRACE_ENABLED, start=0.0, spin_ns=None, tempo=1.0):
+        super().__init__(daemon=True)
+        self.filepath = filepath
+        self.tempo = tempo
+        self.trace = trace
+        self.start_at = start
+        self.spin_ns = spin_ns
+        self.error = None
+        self.elapsed = 0.0
+
+    def run(self):
+        t0 = time.perf_counter_ns()
+        try:
+            self.program = compile_song(self.filepath, self.tempo)
+            self.start_index = self.program.seek(self.start_at)
+        except SongError as e:
+            self.error = e
+            return
+        self.backend = default_backend()
+        self.backend.prepare(self.program.key_groups)
+        self.stop = threading.Event()
+        self.waiter = HybridWaiter(stop_event=self.stop)
+        if self.spin_ns is None: self.waiter.calibrate()
+        else: self.waiter.spin_ns = self.spin_ns
+        self.telemetry = Telemetry(self.program) if self.trace else None
+        warm_up(self.program, self.waiter, self.start_index, WARMUP_WAITS if self.spin_ns is None else 0)
+        self.elapsed = (time.perf_counter_ns() - t0) / 1e9
 
-    total_duration = get_song_duration(notes, bpm)
-    elapsed_time = 0.0
-    active_modifier = None 
+def warm_up(program, waiter, start_index=0, waits=WARMUP_WAITS):
+    """Touches the Program's arrays and runs the waiter and seek paths once before they're timed."""
+    touched = sum(program.targets[start_index:]) + sum(program.actions[start_index:])
+    touched += sum(len(codes) for codes in program.groups[start_index:])
+    program.held_modifiers(start_index)
+    format_time(program.position(start_index))
+    for _ in range(waits):
+        waiter.wait_until(waiter.clock() + WARMUP_WAIT_NS)
+    waiter.last_error = 0
+    return touched
 
-    print(f"\n>>> NOW PLAYING: {title} <<<")
+# ==========================================
+# PLAYER ENGINE
+# ==========================================
+
+def play_preroll(preroll, origin=None):
+    """
+    Plays a finished PreRoll (see play_program for origin). Returns the index of
+    the first event not played, or None if the song failed to load.
+    """
+    if preroll.error:
+        print(f"\n[!] Can't play {preroll.error}")
+        return None
+    program, start_index = preroll.program, preroll.start_index
+
+    print(f"\n>>> NOW PLAYING: {program.title} <<<")
+    if start_index or program.tempo != 1.0:
+        print(f"(From {format_time(program.position(start_index))} at x{program.tempo:g} tempo)")
     print(f"(Press 'ESC' to stop)")
-    ctypes.windll.user32.GetAsyncKeyState(VK_ESCAPE) # Clear buffer
+    GetAsyncKeyState(VK_ESCAPE) # Clear buffer
+
+    telemetry = preroll.telemetry
+    stopped_at = play_program(program, preroll.waiter, preroll.backend, telemetry, start_index, preroll.stop, origin)
+    if stopped_at == len(program):
+        print(f"\r[√] Song finished: {format_time(program.duration)}          \n")
+
+    if telemetry:
+        write_trace(telemetry, program.title, preroll.filepath, section_windows(program))
+    return stopped_at
+
+def play_song_from_file(filepath, trace=TRACE_ENABLED, start=0.0, tempo=1.0, preroll=None):
+    """
+    Plays a song from start (seconds or a section marker name) at the given tempo.
+    preroll is a finished PreRoll for the same song and tempo; without one the pre-roll runs inline.
+    Returns the song position (s) where ESC stopped it, or None if it finished or failed.
+    """
+    if preroll is None:
+        preroll = PreRoll(filepath, trace, start, tempo=tempo)
+        preroll.run()
+    stopped_at = play_preroll(preroll)
+    if stopped_at is None or stopped_at == len(preroll.program): return None
+    return preroll.program.position(stopped_at)
 
+# ==========================================
+# PLAYLIST
+# ==========================================
+# Songs in a playlist share one timeline: each starts at an absolute origin
+# gap_beats (at the previous song's BPM) after the previous song's last beat,
+# so the gap doesn't depend on how long loading or trace writing took. The
+# next song is pre-rolled on a background thread while the current one plays,
+# with the calibration from the first song, and the GIL switch interval is
+# lowered meanwhile so the compile thread can't hold up the injector for long.
+
+def playlist_order(paths, shuffle=False, repeat=False):
+    """Yields paths in play order: reshuffled every pass with shuffle, forever with repeat."""
+    while paths:
+        order = list(paths)
+        if shuffle: random.shuffle(order)
+        yield from order
+        if not repeat: return
+
+def play_playlist(paths, trace=TRACE_ENABLED, tempo=1.0, shuffle=False, repeat=False, gap_beats=PLAYLIST_GAP_BEATS):
+    """
+    Plays paths back to back with one countdown. Returns (path, position, tempo) of the
+    song ESC stopped, or None if the playlist ran out.
+    """
+    queue_order = playlist_order(paths, shuffle, repeat)
+    path = next(queue_order, None)
+    if path is None: return None
+
+    current = PreRoll(path, trace, tempo=tempo)
+    countdown(current)
+    spin_ns = None if current.error else current.waiter.spin_ns
+    origin = None
+    failures = 0
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(PRELOAD_SWITCH_SEC)
     try:
-        for i, instruction in enumerate(notes):
-            # Parse Instruction
-            if len(instruction) == 3: notes_raw, mod_req, duration = instruction
-            else: notes_raw, duration = instruction; mod_req = None
-            
-            if isinstance(notes_raw, str): notes_raw = [notes_raw]
-            
-            # --- 1. MODIFIER MANAGEMENT (LATCHING) ---
-            mod_code = KEYS.get(mod_req) if mod_req else None
-            
-            if active_modifier != mod_req:
-                if active_modifier:
-                    old_code = KEYS.get(active_modifier)
-                    if old_code: ReleaseKey(old_code)
-                
-                if mod_req and mod_code:
-                    PressKey(mod_code)
-                    time.sleep(MOD_LEAD_TIME)
-                
-                active_modifier = mod_req
-
-            # --- 2. NOTE PLAYBACK ---
-            seconds_per_beat = 60.0 / bpm
-            base_sleep = duration * seconds_per_beat
-            actual_total_duration = base_sleep + random.uniform(0, TIMING_VARIANCE)
-            
-            start_press = time.time()
-            
-            # --- FIX v19.1: Filter None values (Rests) ---
-            keys_to_press = [KEYS[n] for n in notes_raw if n in KEYS and KEYS[n] is not None]
-            
-            if keys_to_press:
-                for k in keys_to_press: PressKey(k)
-                time.sleep(PRESS_DURATION)
-                for k in keys_to_press: ReleaseKey(k)
-            
-            press_overhead = time.time() - start_press
-            
-            # --- 3. LOOKAHEAD STRATEGY ---
-            should_release_mod = True
-            if i + 1 < len(notes):
-                next_inst = notes[i+1]
-                if len(next_inst) == 3: next_mod = next_inst[1]
-                else: next_mod = None
-                
-                if next_mod == active_modifier:
-                    should_release_mod = False
-            
-            if should_release_mod and active_modifier:
-                if mod_code: ReleaseKey(mod_code)
-                active_modifier = None
-
-            # --- 4. SLEEP & DISPLAY ---
-            timer_str = f"[{format_time(elapsed_time)} / {format_time(total_duration)}]"
-            print(f"\rPlaying... {timer_str}   ", end="")
-            
-            remaining_time = max(0, actual_total_duration - press_overhead)
-            if interruptible_sleep(remaining_time):
-                print("\n[!] Music stopped by user.")
-                if active_modifier and mod_code:
-                    ReleaseKey(mod_code)
-                return
-
-            elapsed_time += (duration * (60.0 / bpm))
-            
+        while current is not None:
+            path = next(queue_order, None)
+            upcoming = PreRoll(path, trace, spin_ns=spin_ns, tempo=tempo) if path else None
+
+            if current.error:
+                print(f"\n[!] Can't play {current.error}")
+                failures += 1
+                if failures >= len(paths): return None     # A whole pass failed to load
+                if upcoming: upcoming.start()
+            else:
+                failures = 0
+                spin_ns = current.waiter.spin_ns
+                clock = current.waiter.clock
+                if origin is None or clock() > origin:
+                    if origin is not None: print(f"[!] Next song was late by {(clock() - origin) / 1e6:.0f} ms")
+                    origin = clock()
+                if upcoming: upcoming.start()
+                stopped_at = play_preroll(current, origin)
+                if stopped_at < len(current.program):
+                    return current.filepath, current.program.position(stopped_at), tempo
+                program = current.program
+                origin += int((program.duration + gap_beats * 60.0 / program.bpm) / tempo * 1e9)
+
+            if upcoming:
+                upcoming.join()
+                if not upcoming.error: print(f"[i] Preloaded {upcoming.program.title} ({upcoming.elapsed * 1e3:.0f} ms)")
+            current = upcoming
     finally:
-        if active_modifier:
-             k = KEYS.get(active_modifier)
-             if k: ReleaseKey(k)
-            
-    print(f"\r[√] Song finished: {format_time(total_duration)}          \n")
+        sys.setswitchinterval(switch_interval)
+    return None
+
+def pick_songs(text, files, playable):
+    """'3 1 2' or '3,1,2' -> those songs; empty -> every playable song."""
+    if not text.strip(): return [path for path in files if path in playable]
+    picked = []
+    for token in text.replace(",", " ").split():
+        if token.isdigit() and 0 <= int(token) - 1 < len(files) and files[int(token) - 1] in playable:
+            picked.append(files[int(token) - 1])
+    return picked
+
+def parse_position(text):
+    """'1:30', '90' or '90.5' -> seconds; anything else is taken as a section marker name."""
+    text = text.strip()
+    if not text: return 0.0
+    try:
+        if ":" in text:
+            minutes, seconds = text.split(":", 1)
+            return int(minutes) * 60 + float(seconds)
+        return float(text)
+    except ValueError:
+        return text
+
+def countdown(preroll=None):
+    """
+    Counts down COUNTDOWN_SEC against an absolute deadline while preroll (a PreRoll, if
+    given) runs in the background. Ends early if the song fails to load, and waits for
+    the pre-roll only if it is still going when the countdown runs out.
+    """
+    print(f"\n[Loading]...")
+    if preroll is not None: preroll.start()
+    end = time.perf_counter() + COUNTDOWN_SEC
+    for i in range(COUNTDOWN_SEC, 0, -1):
+        print(f"Starting in {i}...", end="\r")
+        if preroll is not None and preroll.error: return
+        time.sleep(max(0.0, end - i + 1 - time.perf_counter()))
+    if preroll is not None:
+        preroll.join()
+        if not preroll.error: print(f"[i] Pre-roll: {preroll.elapsed * 1e3:.0f} ms")
 
 def main():
+    parser = argparse.ArgumentParser(description="Where Winds Meet Auto-Bard player.")
+    parser.add_argument("--trace", action="store_true", default=TRACE_ENABLED,
+                        help=f"record per-event timing and write a jitter report to '{TRACE_DIR}/'")
+    parser.add_argument("--start", default="0", help="start position: m:ss, seconds or a section name")
+    parser.add_argument("--tempo", type=float, default=1.0, help="playback speed factor, e.g. 0.75 to rehearse slower")
+    parser.add_argument("--gap", type=float, default=PLAYLIST_GAP_BEATS, help="playlist: beats of silence between songs")
+    parser.add_argument("--shuffle", action="store_true", help="playlist: shuffle the queue (again on every repeat)")
+    parser.add_argument("--repeat", action="store_true", help="playlist: start over after the last song until ESC")
+    args = parser.parse_args()
+    if args.tempo <= 0: parser.error("--tempo must be positive")
+    if args.gap < 0: parser.error("--gap can't be negative")
+
     if not os.path.exists(SONGS_DIR): os.makedirs(SONGS_DIR)
+    library = SongLibrary.LibraryIndex(SONGS_DIR)
+    resume = None   # (path, position, tempo) of the last song stopped with ESC
         
     while True:
-        files = glob.glob(os.path.join(SONGS_DIR, "*.json"))
+        songs = library.refresh()
+        files = [path for path, _ in songs]
         
         print("\n" + "="*40)
-        print("   WHERE WINDS MEET - AUTO-BARD (v19.1)")
+        print("   WHERE WINDS MEET - AUTO-BARD (v21.0)")
         print("="*40)
         
         if not files:
@@ -202,18 +945,18 @@ def main():
             input("Press Enter...")
             continue
 
-        for i, fpath in enumerate(files):
-            with open(fpath, 'r') as f:
-                try:
-                    meta = json.load(f)
-                    bpm = meta.get("bpm", 120)
-                    if 'notes' in meta: notes = meta['notes']
-                    elif 'tracks' in meta: notes = meta['tracks'].get('Lead_Melody', [])
-                    else: notes = []
-                    print(f"{i+1}. {meta.get('title', 'Unknown')} [{format_time(get_song_duration(notes, bpm))}]")
-                except:
-                    print(f"{i+1}. [Corrupt File] {os.path.basename(fpath)}")
+        titles = {}
+        for i, (fpath, meta) in enumerate(songs):
+            if "error" in meta:
+                print(f"{i+1}. [Corrupt File] {os.path.basename(fpath)}")
+            else:
+                titles[fpath] = meta['title']
+                print(f"{i+1}. {meta['title']} [{format_time(meta['duration'])}]")
                 
+        if resume and resume[0] in titles:
+            print(f"R. Resume {titles[resume[0]]} from {format_time(resume[1])}" + (f" at x{resume[2]:g}" if resume[2] != 1.0 else ""))
+        print(f"S. Start at a position / section")
+        print(f"P. Playlist" + (" (shuffle)" if args.shuffle else "") + (" (repeat)" if args.repeat else ""))
         print(f"Q. Quit")
         
         start_time = time.time()
@@ -229,17 +972,41 @@ def main():
             time.sleep(0.1)
 
         if choice == 'q': break
-        
-        if choice.isdigit():
+
+        if choice == 'p':
+            playlist = pick_songs(input("\nSongs in order (e.g. 3 1 2, Enter for all): "), files, titles)
+            if not playlist:
+                print("\nInvalid selection.")
+                continue
+            resume = play_playlist(playlist, trace=args.trace, tempo=args.tempo, shuffle=args.shuffle,
+                                   repeat=args.repeat, gap_beats=args.gap)
+            continue
+
+        path, start, tempo = None, parse_position(args.start), args.tempo
+        if choice == 'r' and resume and resume[0] in titles:
+            path, start, tempo = resume
+        elif choice == 's':
+            pick = input("\nSong number: ").strip()
+            if pick.isdigit() and 0 <= int(pick) - 1 < len(files):
+                path = files[int(pick) - 1]
+                start = parse_position(input("Start at (m:ss, seconds or section name): "))
+                speed = input(f"Tempo [x{tempo:g}]: ").strip()
+                try:
+                    if speed: tempo = float(speed)
+                except ValueError:
+                    pass
+                if tempo <= 0: tempo = args.tempo
+        elif choice.isdigit():
             idx = int(choice) - 1
-            if 0 <= idx < len(files):
-                print(f"\n[Loading]...")
-                for i in range(COUNTDOWN_SEC, 0, -1):
-                    print(f"Starting in {i}...", end="\r")
-                    time.sleep(1)
-                play_song_from_file(files[idx])
-        else:
+            if 0 <= idx < len(files): path = files[idx]
+
+        if path is None:
             print("\nInvalid selection.")
+            continue
+        preroll = PreRoll(path, trace=args.trace, start=start, tempo=tempo)
+        countdown(preroll)
+        stopped_at = play_song_from_file(path, trace=args.trace, start=start, tempo=tempo, preroll=preroll)
+        resume = (path, stopped_at, tempo) if stopped_at is not None else None
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,305 @@
+"""
+Benchmark.py
+Performance benchmarks for the Auto-Bard engine.
+v1.0: Four suites, each reporting flat named metrics:
+      - generate: MusicUtils generator throughput on synthetic pieces (1k/10k/100k instructions).
+      - build:    Songwriter.load_and_compile over a generated composition library (cold and cached).
+      - load:     song load/parse time for JSON and .bard, raw and through Bard.compile_song.
+      - schedule: Bard.play_program against the RecordingBackend on a simulated clock, plus a
+                  short real-clock run.
+      Every run is written to benchmarks/ as JSON and compared against benchmarks/baseline.json;
+      --save-baseline replaces the baseline with the current run.
+Last Update: 2026-10-17
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import platform
+import contextlib
+import io
+from itertools import islice
+
+import MusicUtils as utils
+import SongFormat
+import Songwriter
+import Bard
+
+# CONFIG
+BENCH_DIR = "benchmarks"
+BASELINE_NAME = "baseline.json"
+GENERATE_SIZES = (1_000, 10_000, 100_000)
+LIBRARY_SONGS = 20              # Compositions in the generated build library
+LIBRARY_SONG_SIZE = 2_000       # Instructions per generated composition
+LOAD_SONG_SIZE = 20_000         # Instructions in the load/parse test song
+SCHEDULE_EVENTS = 5_000         # Instructions in the simulated-clock playback run
+REAL_SCHEDULE_SEC = 5.0         # Length of the real-clock playback run
+REPEATS = 3                     # Timed metrics keep the best of this many runs
+TOLERANCE = 0.10                # Relative change reported as a regression
+SEED = "benchmark"
+
+# Simulated clock: every clock read costs CLOCK_READ_NS, every sleep overshoots by
+# SLEEP_OVERSHOOT_NS plus exponential noise with mean SLEEP_JITTER_NS.
+CLOCK_READ_NS = 100
+SLEEP_OVERSHOOT_NS = 60_000
+SLEEP_JITTER_NS = 400_000
+
+def best_of(fn, repeats=REPEATS):
+    """Runs fn repeats times and returns the fastest wall time in seconds."""
+    best = float('inf')
+    for _ in range(repeats):
+        t0 = time.perf_counter_ns()
+        fn()
+        best = min(best, (time.perf_counter_ns() - t0) / 1e9)
+    return best
+
+def metric(value, unit, better="lower"):
+    return {"value": value, "unit": unit, "better": better}
+
+# ==========================================
+# SYNTHETIC MUSIC
+# ==========================================
+
+MOTIF = [(["L6"], 0.5), (["M1"], 0.5), (["M3"], 0.5), (["M5"], 0.25), (["M6"], 0.25), (["REST"], 1.0)]
+
+def iter_synthetic_piece():
+    """An endless piece that cycles through the MusicUtils generators."""
+    while True:
+        yield from utils.iter_progressive_repeat(MOTIF, 4)
+        yield from utils.pipeline(MOTIF, lambda s: utils.iter_style_apply(s, 'mute'), utils.iter_mutate_rhythm)
+        yield from utils.iter_style_apply(MOTIF * 2, 'virtuoso')
+        yield from utils.iter_dynamic_tremolo(["L2", "L6"], duration=2.0, modifier="SHIFT")
+        yield from utils.iter_strum(["M1", "M3", "M5"], duration=2.0)
+        yield from utils.iter_arpeggio(["H1", "H3", "H5"], direction='random')
+        yield from utils.iter_chug(["L6"], 4)
+
+def synthetic_piece(count):
+    random.seed(SEED)
+    return list(islice(iter_synthetic_piece(), count))
+
+def synthetic_song(count, title="Benchmark Song"):
+    return {"title": title, "bpm": 120, "notes": [list(inst) for inst in synthetic_piece(count)]}
+
+COMPOSITION_SOURCE = '''import MusicUtils as utils
+
+def compose():
+    motif = {motif!r}
+    notes = []
+    while len(notes) < {size}:
+        notes.extend(utils.progressive_repeat(motif, 4))
+        notes.extend(utils.style_apply(motif * 2, 'virtuoso'))
+        notes.extend(utils.dynamic_tremolo(["L2", "L6"], duration=2.0, modifier="SHIFT"))
+        notes.extend(utils.strum(["M1", "M3", "M5"], duration=2.0))
+    return {{"title": "Benchmark {index}", "bpm": 120, "notes": notes[:{size}]}}
+'''
+
+# ==========================================
+# SUITES
+# ==========================================
+
+def bench_generate(sizes=GENERATE_SIZES):
+    results = {}
+    for size in sizes:
+        seconds = best_of(lambda: synthetic_piece(size))
+        results[f"generate.{size}.seconds"] = metric(seconds, "s")
+        results[f"generate.{size}.throughput"] = metric(size / seconds, "instr/s", "higher")
+    return results
+
+def bench_build(songs=LIBRARY_SONGS, size=LIBRARY_SONG_SIZE):
+    work = tempfile.mkdtemp(prefix="bard_bench_")
+    saved = Songwriter.COMPOSITIONS_DIR, Songwriter.OUTPUT_DIR
+    Songwriter.COMPOSITIONS_DIR = os.path.join(work, "compositions")
+    Songwriter.OUTPUT_DIR = os.path.join(work, "songs")
+    try:
+        os.makedirs(Songwriter.COMPOSITIONS_DIR)
+        os.makedirs(Songwriter.OUTPUT_DIR)
+        for i in range(songs):
+            with open(os.path.join(Songwriter.COMPOSITIONS_DIR, f"bench_{i:03d}.py"), 'w') as f:
+                f.write(COMPOSITION_SOURCE.format(index=i, size=size, motif=MOTIF))
+
+        def build(force):
+            with contextlib.redirect_stdout(io.StringIO()):
+                Songwriter.load_and_compile(force=force)
+
+        cold = best_of(lambda: build(True))
+        cached = best_of(lambda: build(False))
+    finally:
+        Songwriter.COMPOSITIONS_DIR, Songwriter.OUTPUT_DIR = saved
+        shutil.rmtree(work, ignore_errors=True)
+
+    return {
+        "build.cold.seconds": metric(cold, "s"),
+        "build.cold.throughput": metric(songs * size / cold, "instr/s", "higher"),
+        "build.cached.seconds": metric(cached, "s"),
+    }
+
+def bench_load(size=LOAD_SONG_SIZE):
+    work = tempfile.mkdtemp(prefix="bard_bench_")
+    json_path = os.path.join(work, "song.json")
+    bard_path = os.path.join(work, "song" + SongFormat.BINARY_EXT)
+    try:
+        song = synthetic_song(size)
+        with open(json_path, 'w') as f:
+            json.dump(song, f)
+        SongFormat.write_binary(bard_path, song)
+
+        def parse_json():
+            with open(json_path, 'r') as f:
+                json.load(f)
+
+        def parse_bard():
+            with SongFormat.BinarySong(bard_path) as mapped:
+                for _ in mapped.records(): pass
+
+        results = {
+            "load.json.parse": metric(best_of(parse_json), "s"),
+            "load.bard.parse": metric(best_of(parse_bard), "s"),
+            "load.json.compile": metric(best_of(lambda: Bard.compile_song(json_path)), "s"),
+            "load.bard.compile": metric(best_of(lambda: Bard.compile_song(bard_path)), "s"),
+            "load.json.bytes": metric(os.path.getsize(json_path), "B"),
+            "load.bard.bytes": metric(os.path.getsize(bard_path), "B"),
+        }
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return results
+
+class SimulatedClock:
+    """A fake perf_counter_ns whose sleeps overshoot like a real OS timer, reproducibly."""
+    def __init__(self, seed=SEED):
+        self.now = 0
+        self.rng = random.Random(seed)
+
+    def clock(self):
+        self.now += CLOCK_READ_NS
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += int(seconds * 1e9) + SLEEP_OVERSHOOT_NS + int(self.rng.expovariate(1 / SLEEP_JITTER_NS))
+
+def lateness_metrics(prefix, telemetry):
+    summary = Bard.jitter_summary(telemetry.lateness())
+    results = {f"{prefix}.events": metric(summary["events"], "events", "higher")}
+    for key in ("p50_us", "p95_us", "p99_us", "max_us", "mean_us"):
+        results[f"{prefix}.{key[:-3]}"] = metric(summary.get(key, 0.0), "us")
+    results[f"{prefix}.missed"] = metric(summary.get("missed", 0), "events")
+    return results
+
+def play_quietly(program, waiter, backend):
+    telemetry = Bard.Telemetry(program)
+    backend.prepare(program.key_groups)
+    with contextlib.redirect_stdout(io.StringIO()):
+        Bard.play_program(program, waiter, backend, telemetry)
+    return telemetry
+
+def bench_schedule(size=SCHEDULE_EVENTS, real_sec=REAL_SCHEDULE_SEC):
+    work = tempfile.mkdtemp(prefix="bard_bench_")
+    path = os.path.join(work, "song.json")
+    try:
+        with open(path, 'w') as f:
+            json.dump(synthetic_song(size), f)
+        program = Bard.compile_song(path)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    sim = SimulatedClock()
+    waiter = Bard.HybridWaiter(clock=sim.clock, sleep=sim.sleep, stop_check=lambda: False)
+    results = lateness_metrics("schedule.sim", play_quietly(program, waiter, Bard.RecordingBackend(sim.clock)))
+
+    # Real clock: the leading events of the same program, for about real_sec
+    real_len = Bard.bisect_left(program.targets, int(real_sec * 1e9))
+    real = Bard.Program(program.title, program.bpm, real_sec,
+                        list(zip(program.targets[:real_len], program.actions[:real_len], program.groups[:real_len])))
+    waiter = Bard.HybridWaiter(stop_check=lambda: False)
+    waiter.calibrate()
+    results.update(lateness_metrics("schedule.real", play_quietly(real, waiter, Bard.RecordingBackend())))
+    return results
+
+SUITES = {
+    "generate": bench_generate,
+    "build": bench_build,
+    "load": bench_load,
+    "schedule": bench_schedule,
+}
+
+# ==========================================
+# BASELINES
+# ==========================================
+
+def environment():
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine()}
+
+def load_run(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_run(run, path):
+    tmp = path + ".tmp"
+    with open(tmp, 'w') as f:
+        json.dump(run, f, indent=1)
+    os.replace(tmp, path)
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Prints every metric next to its baseline value. Returns the names of regressed metrics."""
+    regressions = []
+    old_results = baseline["results"] if baseline else {}
+    for name, current in results.items():
+        line = f"  {name:<28} {current['value']:>12.5g} {current['unit']}"
+        old = old_results.get(name)
+        if old and old["value"]:
+            change = (current["value"] - old["value"]) / abs(old["value"])
+            worse = change > tolerance if current["better"] == "lower" else change < -tolerance
+            line += f"   ({change:+.1%} vs baseline)"
+            if worse:
+                line += "  [REGRESSION]"
+                regressions.append(name)
+        print(line)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks compile throughput, load latency and scheduler jitter.")
+    parser.add_argument("suites", nargs="*", help=f"suites to run (default: all of {', '.join(SUITES)})")
+    parser.add_argument("--save-baseline", action="store_true", help=f"store this run as '{BENCH_DIR}/{BASELINE_NAME}'")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="relative change reported as a regression (default 0.10)")
+    args = parser.parse_args()
+    unknown = [name for name in args.suites if name not in SUITES]
+    if unknown: parser.error(f"unknown suite(s): {', '.join(unknown)}")
+
+    print("========================================")
+    print("   WWM BARD BENCHMARKS")
+    print("========================================")
+    if not os.path.exists(BENCH_DIR): os.makedirs(BENCH_DIR)
+    baseline_path = os.path.join(BENCH_DIR, BASELINE_NAME)
+    baseline = load_run(baseline_path)
+
+    results = {}
+    regressions = []
+    for name in args.suites or SUITES:
+        print(f"\n[{name}]")
+        suite_results = SUITES[name]()
+        regressions += compare(suite_results, baseline, args.tolerance)
+        results.update(suite_results)
+
+    run = {"recorded": time.strftime("%Y-%m-%d %H:%M:%S"), "environment": environment(), "results": results}
+    run_path = os.path.join(BENCH_DIR, f"run_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    save_run(run, run_path)
+    print(f"\n[i] Results written: {run_path}")
+
+    if args.save_baseline:
+        if baseline: results = {**baseline["results"], **results}
+        save_run({**run, "results": results}, baseline_path)
+        print(f"[i] Baseline saved: {baseline_path}")
+    elif baseline is None:
+        print(f"[i] No baseline yet; run with --save-baseline to keep this one.")
+    elif baseline.get("environment") != run["environment"]:
+        print(f"[i] Baseline was recorded on {baseline['environment'].get('platform')}; comparisons are rough.")
+
+    if regressions and not args.save_baseline:
+        print(f"[!] {len(regressions)} metric(s) regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
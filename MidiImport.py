@@ -0,0 +1,351 @@
+"""
+MidiImport.py
+Converts Standard MIDI Files into songs for the 21-key guqin grid.
+v1.0: Initial importer.
+      - Streams SMF type 0/1 files from a memory map; tracks are merged lazily by tick.
+      - Pitches are moved by the transposition that lands most notes on the grid (or on
+        --scale), folded into L1-H7 by octaves and snapped to the nearest allowed key.
+      - Onsets are quantized to --grid beats; each strike keeps at most --max-notes keys
+        (top and bottom voices first, then the loudest). Drums (channel 10) are skipped.
+      - Writes a compiled song through the Songwriter's streaming writer (songs/), or a
+        composition module with --module (compositions/). --jobs converts in worker processes.
+v1.1: Conversions go through Songwriter.run_isolated, so a dead worker only fails its own
+      file and its .tmp outputs are removed.
+Last Update: 2026-10-17
+"""
+import os
+import re
+import json
+import io
+import sys
+import glob
+import mmap
+import heapq
+import argparse
+import contextlib
+import traceback
+
+import MusicUtils as utils
+import SongLibrary
+import SongFormat
+import Songwriter
+
+# CONFIG
+MIDI_EXTS = (".mid", ".midi")
+GRID_BEATS = 0.25               # Onsets snap to sixteenth notes
+MAX_NOTES = 3                   # Keys pressed together in one strike
+DEFAULT_BPM = 120
+DRUM_CHANNEL = 9                # General MIDI percussion (channel 10), not pitched
+M1_PITCH = 60                   # MIDI pitch of M1 (middle C)
+DEGREE_SEMITONES = (0, 2, 4, 5, 7, 9, 11)
+
+GRID_PITCHES = [M1_PITCH + 12 * (i // 7 - 1) + DEGREE_SEMITONES[i % 7] for i in range(len(utils.ALL_NOTES))]
+LOW_PITCH, HIGH_PITCH = GRID_PITCHES[0], GRID_PITCHES[-1]
+
+# ==========================================
+# SMF READER
+# ==========================================
+# Only what a song needs is decoded: note on/off, the first tempo and the
+# first track name. Everything else (controllers, sysex, other meta events)
+# is skipped by length. Every track is a generator over the shared mapping,
+# and heapq.merge interleaves them, so no event list is ever built.
+
+NOTE_ON, NOTE_OFF, TEMPO, NAME = range(4)
+DATA_BYTES = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+def read_varlen(data, pos):
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80: return value, pos
+
+def track_events(data, pos, end):
+    """Yields (tick, kind, a, b) for one MTrk chunk: notes as (pitch, velocity), tempo as (us per beat, 0)."""
+    tick = 0
+    status = 0
+    while pos < end:
+        delta, pos = read_varlen(data, pos)
+        tick += delta
+        if data[pos] & 0x80:
+            status = data[pos]
+            pos += 1
+        if status == 0xFF:
+            kind = data[pos]
+            length, pos = read_varlen(data, pos + 1)
+            if kind == 0x51 and length == 3: yield tick, TEMPO, int.from_bytes(data[pos:pos + 3], 'big'), 0
+            elif kind == 0x03: yield tick, NAME, bytes(data[pos:pos + length]).decode('latin-1').strip(), 0
+            elif kind == 0x2F: return
+            pos += length
+        elif status in (0xF0, 0xF7):
+            length, pos = read_varlen(data, pos)
+            pos += length
+        elif status & 0xF0 in DATA_BYTES:
+            message, channel = status & 0xF0, status & 0x0F
+            if message in (0x80, 0x90) and channel != DRUM_CHANNEL:
+                pitch, velocity = data[pos], data[pos + 1]
+                yield tick, NOTE_ON if message == 0x90 and velocity else NOTE_OFF, pitch, velocity
+            pos += DATA_BYTES[message]
+        else:
+            raise ValueError(f"bad MIDI status byte {status:#04x}")
+
+class MidiFile:
+    """A memory-mapped Standard MIDI File. events() walks every track merged by tick."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self.map[:4] != b'MThd': raise ValueError(f"{path} is not a MIDI file")
+            length = int.from_bytes(self.map[4:8], 'big')
+            self.format = int.from_bytes(self.map[8:10], 'big')
+            division = int.from_bytes(self.map[12:14], 'big')
+            if division & 0x8000: raise ValueError(f"{path}: SMPTE time division is not supported")
+            if division == 0: raise ValueError(f"{path}: invalid time division")
+            self.ticks_per_beat = division
+            self.tracks = []
+            pos = 8 + length
+            while pos + 8 <= len(self.map):
+                size = int.from_bytes(self.map[pos + 4:pos + 8], 'big')
+                if self.map[pos:pos + 4] == b'MTrk': self.tracks.append((pos + 8, min(pos + 8 + size, len(self.map))))
+                pos += 8 + size
+            if not self.tracks: raise ValueError(f"{path} has no tracks")
+        except Exception:
+            self.map.close()
+            raise
+
+    def events(self):
+        """(tick, kind, a, b) over all tracks in tick order."""
+        return heapq.merge(*(track_events(self.map, start, end) for start, end in self.tracks), key=lambda event: event[0])
+
+    def header(self):
+        """(title or None, bpm) from the name and tempo events of the first track."""
+        title, bpm = None, None
+        for _, kind, a, _ in track_events(self.map, *self.tracks[0]):
+            if kind == NAME and title is None and a: title = a
+            elif kind == TEMPO and bpm is None: bpm = round(60_000_000 / a, 3)
+            if title is not None and bpm is not None: break
+        return title, bpm or DEFAULT_BPM
+
+    def close(self):
+        self.map.close()
+
+# ==========================================
+# PITCH MAPPING
+# ==========================================
+
+def pitch_histogram(midi):
+    """Note-on counts per MIDI pitch."""
+    counts = [0] * 128
+    for _, kind, pitch, _ in midi.events():
+        if kind == NOTE_ON: counts[pitch] += 1
+    return counts
+
+def best_transposition(counts, keys):
+    """
+    Semitone shift that puts the most notes on a pitch class of keys (grid indices),
+    then the octave that puts the most of them inside L1-H7. Ties go to the smallest shift.
+    """
+    classes = {GRID_PITCHES[i] % 12 for i in keys}
+    pitches = [p for p in range(128) if counts[p]]
+
+    def on_grid(shift): return sum(counts[p] for p in pitches if (p + shift) % 12 in classes)
+    shift = max(range(-6, 6), key=lambda s: (on_grid(s), -abs(s)))
+
+    def in_range(octaves): return sum(counts[p] for p in pitches if LOW_PITCH <= p + shift + 12 * octaves <= HIGH_PITCH)
+    octave = max(range(-4, 5), key=lambda o: (in_range(o), -abs(o)))
+    return shift + 12 * octave
+
+def key_map(keys, transpose):
+    """MIDI pitch -> note name: transposed, folded into L1-H7 by octaves, snapped to the nearest of keys."""
+    pitches = sorted((GRID_PITCHES[i], utils.ALL_NOTES[i]) for i in keys)
+    mapping = {}
+    for pitch in range(128):
+        p = pitch + transpose
+        while p < LOW_PITCH: p += 12
+        while p > HIGH_PITCH: p -= 12
+        mapping[pitch] = min(pitches, key=lambda key: (abs(key[0] - p), key[0]))[1]
+    return mapping
+
+# ==========================================
+# QUANTIZE & REDUCE
+# ==========================================
+
+def reduce_chord(notes, max_notes):
+    """Keeps the top and bottom voices, then the loudest, up to max_notes keys. notes: {name: velocity}."""
+    if len(notes) <= max_notes: return sorted(notes, key=utils.NOTE_INDEX.get)
+    by_pitch = sorted(notes, key=utils.NOTE_INDEX.get)
+    kept = [by_pitch[-1], by_pitch[0]][:max_notes]
+    rest = sorted(by_pitch[1:-1], key=lambda name: -notes[name])
+    return sorted(kept + rest[:max_notes - len(kept)], key=utils.NOTE_INDEX.get)
+
+def midi_instructions(midi, mapping, grid=GRID_BEATS, max_notes=MAX_NOTES):
+    """
+    Yields ([notes], beats) instructions: every onset slot becomes one strike lasting until
+    the next, with a leading rest if the first note comes late. The last strike lasts as
+    long as its longest note.
+    """
+    ticks = midi.ticks_per_beat * grid
+    slot, chord, tail = None, {}, 1
+    onsets = {}     # pitch -> slot of the strike that sounded it
+
+    for tick, kind, pitch, velocity in midi.events():
+        if kind == NOTE_OFF:
+            if onsets.pop(pitch, None) == slot: tail = max(tail, round(tick / ticks) - slot)
+            continue
+        if kind != NOTE_ON: continue
+        current = round(tick / ticks)
+        if current != slot:
+            if chord: yield reduce_chord(chord, max_notes), round((current - slot) * grid, 6)
+            elif current > 0: yield ["REST"], round(current * grid, 6)
+            slot, chord, tail = current, {}, 1
+        name = mapping[pitch]
+        chord[name] = max(chord.get(name, 0), velocity)
+        onsets[pitch] = slot
+    if chord: yield reduce_chord(chord, max_notes), round(tail * grid, 6)
+
+# ==========================================
+# OUTPUT
+# ==========================================
+
+def song_name(path):
+    """File stem as a module/song name: 'My Song (v2).mid' -> 'my_song_v2'."""
+    name = re.sub(r'\W+', '_', os.path.splitext(os.path.basename(path))[0].lower()).strip('_') or "song"
+    return "midi_" + name if name[0].isdigit() else name
+
+def module_source(name, path, song, notes, transpose, settings):
+    """A composition module that returns the imported notes."""
+    lines = [f'"""',
+             f'{name}.py',
+             f"Imported from '{os.path.basename(path)}' by MidiImport.py.",
+             f"v1.0: Transposed {transpose:+d}, grid {settings['grid']:g} beats, at most {settings['max_notes']} notes per strike.",
+             f'"""',
+             f'import MusicUtils as utils',
+             f'',
+             f'def compose():',
+             f'    TITLE = {json.dumps(song["title"])}',
+             f'    BPM = {song["bpm"]!r}',
+             f'',
+             f'    track = [']
+    lines += [f'        ({json.dumps(notes_)}, {beats!r}),' for notes_, beats in notes]
+    lines += [f'    ]',
+              f'',
+              f'    utils.check_length(track, BPM)',
+              f'',
+              f'    return {{',
+              f'        "title": TITLE,',
+              f'        "bpm": BPM,',
+              f'        "notes": track',
+              f'    }}',
+              f'']
+    return "\n".join(lines)
+
+def import_midi(path, settings):
+    """
+    Converts one MIDI file in the way settings asks. Runs the same in-process and in a
+    worker. Returns (name, build or None, captured console output): a Songwriter build
+    to commit, {"module": path} for a written module, or None if nothing was written.
+    """
+    name = song_name(path)
+    build = None
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        midi = None
+        try:
+            midi = MidiFile(path)
+            title, bpm = midi.header()
+            keys = [utils.NOTE_INDEX[n] for n in utils.SCALES[settings["scale"]]] if settings["scale"] else range(len(utils.ALL_NOTES))
+            transpose = settings["transpose"]
+            if transpose is None: transpose = best_transposition(pitch_histogram(midi), keys)
+            notes = midi_instructions(midi, key_map(keys, transpose), settings["grid"], settings["max_notes"])
+            song = {"title": title or os.path.splitext(os.path.basename(path))[0], "bpm": bpm, "notes": notes}
+
+            if settings["module"]:
+                module_path = os.path.join(Songwriter.COMPOSITIONS_DIR, name + ".py")
+                if os.path.exists(module_path) and not settings["force"]:
+                    print(f"[-] Skipped {os.path.basename(path)}: {module_path} exists (use --force)")
+                else:
+                    source = module_source(name, path, song, list(notes), transpose, settings)
+                    with open(module_path + ".tmp", 'w') as f: f.write(source)
+                    os.replace(module_path + ".tmp", module_path)
+                    build = {"module": module_path}
+                    print(f"[+] {os.path.basename(path)} -> {module_path} (transposed {transpose:+d})")
+            elif os.path.exists(os.path.join(Songwriter.COMPOSITIONS_DIR, name + ".py")):
+                print(f"[!] Skipped {os.path.basename(path)}: '{name}' is a composition's song")
+            else:
+                print(f"[i] {os.path.basename(path)}: transposed {transpose:+d}")
+                build = Songwriter.stream_song(os.path.join(Songwriter.OUTPUT_DIR, name + ".json"), song, settings["options"])
+        except (ValueError, IndexError) as e:
+            print(f"[!] Failed to import {os.path.basename(path)}: {e if isinstance(e, ValueError) else 'file is truncated'}")
+        except Exception as e:
+            print(f"[!] Failed to import {os.path.basename(path)}: {e}")
+            traceback.print_exc()
+        finally:
+            if midi: midi.close()
+    return name, build, log.getvalue()
+
+def output_paths(name, settings):
+    """The files import_midi writes for name, each via a .tmp file."""
+    if settings["module"]: return [os.path.join(Songwriter.COMPOSITIONS_DIR, name + ".py")]
+    return [os.path.join(Songwriter.OUTPUT_DIR, name + ext) for ext in (".json", SongFormat.BINARY_EXT)]
+
+def import_all(paths, jobs, settings):
+    """
+    Yields (path, name, build, log) in the order of paths, like Songwriter.compile_all: a
+    worker that dies only fails its own file (see Songwriter.run_isolated).
+    """
+    for path, result, error in Songwriter.run_isolated(import_midi, paths, jobs, settings):
+        if error is None:
+            yield (path, *result)
+            continue
+        name = song_name(path)
+        Songwriter.discard_tmp(output_paths(name, settings))
+        yield path, name, None, f"[!] Failed to import {os.path.basename(path)}: worker crashed\n{error}"
+
+def midi_files(inputs):
+    """Files as given; folders are searched recursively for .mid/.midi files."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths += sorted(p for p in glob.glob(os.path.join(item, "**", "*"), recursive=True) if p.lower().endswith(MIDI_EXTS))
+        else:
+            paths.append(item)
+    return paths
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts MIDI files into songs for the 21-key grid.")
+    parser.add_argument("inputs", nargs="+", help="MIDI files or folders (searched recursively)")
+    parser.add_argument("--scale", choices=sorted(utils.SCALES), help="snap to this scale (default: every key)")
+    parser.add_argument("--transpose", type=int, help="semitones to shift by (default: best fit)")
+    parser.add_argument("--grid", type=float, default=GRID_BEATS, help=f"onset grid in beats (default {GRID_BEATS:g})")
+    parser.add_argument("--max-notes", type=int, default=MAX_NOTES, help=f"keys per strike (default {MAX_NOTES})")
+    parser.add_argument("--module", action="store_true", help=f"write composition modules to '{Songwriter.COMPOSITIONS_DIR}/' instead of songs")
+    parser.add_argument("--force", action="store_true", help="overwrite existing modules")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="convert in N worker processes (0 = one per CPU)")
+    parser.add_argument("--no-optimize", action="store_true", help="write instructions without the peephole optimizer")
+    parser.add_argument("--reflow", action="store_true", help="thin passages too fast for Bard's press/modifier timing")
+    args = parser.parse_args()
+    if args.grid <= 0: parser.error("--grid must be positive")
+    if args.max_notes < 1: parser.error("--max-notes must be at least 1")
+    settings = {"scale": args.scale, "transpose": args.transpose, "grid": args.grid, "max_notes": args.max_notes,
+                "module": args.module, "force": args.force,
+                "options": {**Songwriter.DEFAULT_OPTIONS, "optimize": not args.no_optimize, "reflow": args.reflow}}
+
+    print("========================================")
+    print("   WWM MIDI IMPORT")
+    print("========================================")
+    paths = midi_files(args.inputs)
+    if not paths: sys.exit("[!] No MIDI files found.")
+    os.makedirs(Songwriter.COMPOSITIONS_DIR if args.module else Songwriter.OUTPUT_DIR, exist_ok=True)
+
+    library = None if args.module else SongLibrary.LibraryIndex(Songwriter.OUTPUT_DIR)
+    imported = 0
+    for path, name, build, log in import_all(paths, args.jobs or os.cpu_count(), settings):
+        print(log, end="")
+        if build is None: continue
+        if "module" not in build: Songwriter.commit_song(name + ".json", build, library)
+        imported += 1
+    if library: library.save()
+    print(f"\n[i] Imported {imported} of {len(paths)} file(s).")
+    if imported < len(paths): sys.exit(1)
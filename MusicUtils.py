@@ -1,9 +1,31 @@
 """
 MusicUtils.py
 Shared tools for the Auto-Bard Songwriters.
-Last Update: 2025-11-22 22:30 EST (v20.0 - Smart Scale Correction)
+v21.0: Streaming generators. Every helper has a lazy iter_* counterpart that yields
+       instructions one at a time; pipeline() chains them into stages. The list
+       helpers are thin wrappers and return exactly what they did before.
+v21.1: NoteSequence (optional, NumPy): vectorised variation, inversion, expansion, rhythm
+       shuffling and scale snapping over whole blocks. develop_motif uses dict lookups
+       instead of scale.index()/ALL_NOTES.index() scans.
+v21.2: arrange() joins named sections and returns section markers for Bard's seek.
+v21.3: Shared blocks. Block is an immutable, hashable tree of instructions; the block_*
+       helpers are LRU-memoized, so repeated riffs and techniques are built once and
+       shared instead of copied. arrange() keeps Block sections as a tree.
+v21.4: Explicit RNG streams. Every randomized helper takes rng=; RandomStreams derives
+       independent, reproducible streams per composition and section, so sections can be
+       generated in any order (or concurrently) and memoized. Without rng the helpers
+       still draw from the global 'random', exactly as before.
+Last Update: 2026-10-17
 """
 import random
+import threading
+from itertools import chain
+from functools import lru_cache, wraps
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # Only NoteSequence needs NumPy
 
 # ==========================================
 # MUSIC THEORY CONSTANTS
@@ -21,17 +43,96 @@ SCALES = {
     "OUTLIER": ["L6", "M1", "M3", "M4", "M5", "M7", "H1", "H2", "H3", "H6"] 
 }
 
+NOTE_INDEX = {note: i for i, note in enumerate(ALL_NOTES)}
+MODIFIERS = (None, "SHIFT", "CTRL")
+MODIFIER_CODES = {name: code for code, name in enumerate(MODIFIERS)}
+BLOCK_CACHE_SIZE = 1024     # Distinct argument sets kept per memoized block_* helper
+
+# ==========================================
+# RANDOM STREAMS
+# ==========================================
+# Every randomized helper takes rng=, any random.Random. Without one it draws
+# from the global 'random' the Songwriter seeds per composition, so what a
+# section gets depends on everything generated before it. A RandomStreams is
+# seeded from a name instead, and streams.section("Verse") from the
+# composition and section names only: a section draws the same notes whatever
+# is generated before it, in which thread, and whether it came from a cache.
+# Only the block_* calls given a RandomStreams are cached: the global 'random'
+# never comes back to a state, so caching on it would only fill memory.
+
+class RandomStreams(random.Random):
+    """
+    A random.Random seeded from name; section(name) derives an independent child stream.
+    It counts the 32-bit words drawn since seeding, so position() identifies exactly where
+    the stream is (the block_* caches key on it) and skip() moves it on as a draw would.
+    """
+    def __init__(self, name=""):
+        self.name = name
+        super().__init__(name)
+
+    def seed(self, a=None, version=2):
+        super().seed(a, version)
+        self.origin = a if isinstance(a, (str, bytes, int, float)) else None    # None: unseeded, can't be replayed
+        self.words = 0
+
+    def setstate(self, state):
+        super().setstate(state)
+        self.origin = None
+
+    def random(self):
+        self.words += 2
+        return super().random()
+
+    def getrandbits(self, k):
+        self.words += (k + 31) // 32
+        return super().getrandbits(k)
+
+    def position(self):
+        """(seed, words drawn), or None if the stream was set some other way."""
+        return None if self.origin is None else (self.origin, self.words)
+
+    def skip(self, words):
+        for _ in range(words): self.getrandbits(32)
+
+    def section(self, name):
+        return RandomStreams(f"{self.name}/{name}")
+
+# ==========================================
+# STREAMING PIPELINE
+# ==========================================
+# The iter_* helpers below are generators: they yield one instruction at a time
+# and accept any iterable as input, so long pieces can be built as a chain of
+# lazy stages without materialising a list per stage. Songwriter streams a
+# generator returned as 'notes' straight to disk.
+
+def pipeline(source, *stages):
+    """
+    Feeds source through each stage in turn and returns the final iterator.
+    A stage is any callable taking an iterable of instructions, e.g.
+    pipeline(riff, lambda s: iter_style_apply(s, 'mute'), iter_mutate_rhythm)
+    """
+    stream = iter(source)
+    for stage in stages:
+        stream = stage(stream)
+    return stream
+
+def sequence(*parts):
+    """Lazily plays parts one after another."""
+    return chain.from_iterable(parts)
+
 # ==========================================
 # MOTIF DEVELOPMENT 
 # ==========================================
 
-def develop_motif(motif, evolution="variation", scale=SCALES["YU"]):
+def iter_develop_motif(motif, evolution="variation", scale=SCALES["YU"], rng=None):
     """
     Takes a base melody and evolves it.
     CRITICAL UPDATE: Now respects the 'scale' to prevent dissonance.
     """
-    new_motif = []
-    
+    rng = rng or random
+    scale_index = {}
+    for i, n in enumerate(scale): scale_index.setdefault(n, i)
+
     for instruction in motif:
         if len(instruction) == 3:
             notes, modifier, duration = instruction
@@ -42,13 +143,13 @@ def develop_motif(motif, evolution="variation", scale=SCALES["YU"]):
             continue
 
         if notes == ["REST"]:
-            new_motif.append(instruction)
+            yield instruction
             continue
 
         new_notes = []
         for n in notes:
             # If note is not in our mapped list, keep it as is
-            if n not in ALL_NOTES:
+            if n not in NOTE_INDEX:
                 new_notes.append(n)
                 continue
             
@@ -57,16 +158,16 @@ def develop_motif(motif, evolution="variation", scale=SCALES["YU"]):
             # If the note isn't in the scale, we default to finding it in ALL_NOTES
             # but we prioritize the scale index for movement.
             
-            if n in scale:
-                curr_idx = scale.index(n)
+            if n in scale_index:
+                curr_idx = scale_index[n]
                 pool = scale
             else:
-                curr_idx = ALL_NOTES.index(n)
+                curr_idx = NOTE_INDEX[n]
                 pool = ALL_NOTES
             
             if evolution == 'variation':
                 # Step up/down within the SCALE, not the chromatic list
-                shift = random.choice([-1, 0, 1]) 
+                shift = rng.choice([-1, 0, 1]) 
                 new_idx = max(0, min(len(pool)-1, curr_idx + shift))
                 new_notes.append(pool[new_idx])
                 
@@ -86,82 +187,91 @@ def develop_motif(motif, evolution="variation", scale=SCALES["YU"]):
                 new_notes.append(n) # Fallback
                 
         if modifier:
-            new_motif.append((new_notes, modifier, duration))
+            yield (new_notes, modifier, duration)
         else:
-            new_motif.append((new_notes, duration))
-            
-    return new_motif
+            yield (new_notes, duration)
 
-def extend_motif(motif, add_count=2, scale=SCALES["YU"]):
+def develop_motif(motif, evolution="variation", scale=SCALES["YU"], rng=None):
+    return list(iter_develop_motif(motif, evolution, scale, rng))
+
+def iter_extend_motif(motif, add_count=2, scale=SCALES["YU"], rng=None):
     """
     Appends notes from the scale to end of motif.
     """
-    new_motif = list(motif)
+    rng = rng or random
+    yield from motif
     for _ in range(add_count):
-        note = random.choice(scale)
+        note = rng.choice(scale)
         # Faster notes for extensions to avoid dragging
-        duration = random.choice([0.5, 0.25])
-        new_motif.append(([note], duration))
-    return new_motif
+        duration = rng.choice([0.5, 0.25])
+        yield ([note], duration)
+
+def extend_motif(motif, add_count=2, scale=SCALES["YU"], rng=None):
+    return list(iter_extend_motif(motif, add_count, scale, rng))
 
-def mutate_rhythm(motif):
+def iter_mutate_rhythm(motif, rng=None):
     """
     Shuffles durations.
+    Needs the whole motif to shuffle, so only this stage buffers its input.
     """
+    motif = list(motif)
     durations = [inst[-1] for inst in motif]
-    random.shuffle(durations)
+    (rng or random).shuffle(durations)
     
-    new_motif = []
     for i, instruction in enumerate(motif):
         parts = list(instruction)
         parts[-1] = durations[i]
-        new_motif.append(tuple(parts))
-        
-    return new_motif
+        yield tuple(parts)
+
+def mutate_rhythm(motif, rng=None):
+    return list(iter_mutate_rhythm(motif, rng))
 
-def progressive_repeat(motif, count, scale=SCALES["YU"]):
+def iter_progressive_repeat(motif, count, scale=SCALES["YU"], rng=None):
     """
     Plays a motif 'count' times, applying evolutions AND extensions.
     """
-    block = []
+    motif = list(motif)
     evolutions = ['base', 'variation', 'extension', 'variation']
     
     for i in range(count):
         evo = evolutions[i % len(evolutions)]
         
         if evo == 'base':
-            block.extend(motif)
+            yield from motif
         elif evo == 'extension':
-            block.extend(extend_motif(motif, add_count=3, scale=scale))
+            yield from iter_extend_motif(motif, add_count=3, scale=scale, rng=rng)
         else:
-            block.extend(develop_motif(motif, evolution=evo, scale=scale))
-            
-    return block
+            yield from iter_develop_motif(motif, evolution=evo, scale=scale, rng=rng)
+
+def progressive_repeat(motif, count, scale=SCALES["YU"], rng=None):
+    return list(iter_progressive_repeat(motif, count, scale, rng))
 
 # ==========================================
 # TECHNIQUE GENERATORS
 # ==========================================
 
-def tremolo(notes_list, duration, modifier=None, speed=0.125):
+def iter_tremolo(notes_list, duration, modifier=None, speed=0.125):
     count = int(duration / speed)
-    block = []
     for _ in range(count):
-        if modifier: block.append((notes_list, modifier, speed))
-        else: block.append((notes_list, speed))
-    return block
+        if modifier: yield (notes_list, modifier, speed)
+        else: yield (notes_list, speed)
 
-def dynamic_tremolo(notes_list, duration, modifier=None, start_speed=0.25, end_speed=0.05):
-    block = []
+def tremolo(notes_list, duration, modifier=None, speed=0.125):
+    return list(iter_tremolo(notes_list, duration, modifier, speed))
+
+def iter_dynamic_tremolo(notes_list, duration, modifier=None, start_speed=0.25, end_speed=0.05):
     current_time = 0
     current_speed = start_speed
     while current_time < duration:
-        if modifier: block.append((notes_list, modifier, current_speed))
-        else: block.append((notes_list, current_speed))
+        if modifier: yield (notes_list, modifier, current_speed)
+        else: yield (notes_list, current_speed)
         current_time += current_speed
         if current_speed > end_speed: current_speed -= 0.01
         elif current_speed < end_speed: current_speed += 0.01
         current_speed = max(0.02, current_speed)
-    return block
+
+def dynamic_tremolo(notes_list, duration, modifier=None, start_speed=0.25, end_speed=0.05):
+    return list(iter_dynamic_tremolo(notes_list, duration, modifier, start_speed, end_speed))
 
 def slide(start_note, end_note, duration):
     step_time = duration / 3
@@ -179,70 +289,433 @@ def ornament(note, duration, type="trill"):
     else:
         return [([note], "CTRL", 0.15), ([note], duration - 0.15)]
 
-def arpeggio(chord, note_duration=0.25, direction='up', modifier=None):
+def iter_arpeggio(chord, note_duration=0.25, direction='up', modifier=None, rng=None):
     notes = list(chord)
     if direction == 'down': notes.reverse()
-    elif direction == 'random': random.shuffle(notes)
-    block = []
+    elif direction == 'random': (rng or random).shuffle(notes)
     for note in notes:
-        if modifier: block.append(([note], modifier, note_duration))
-        else: block.append(([note], note_duration))
-    return block
+        if modifier: yield ([note], modifier, note_duration)
+        else: yield ([note], note_duration)
 
-def strum(chord, duration=1.0, speed=0.05, modifier=None):
+def arpeggio(chord, note_duration=0.25, direction='up', modifier=None, rng=None):
+    return list(iter_arpeggio(chord, note_duration, direction, modifier, rng))
+
+def iter_strum(chord, duration=1.0, speed=0.05, modifier=None):
     strum_time = len(chord) * speed
     sustain_time = max(0, duration - strum_time)
-    block = []
     for note in chord:
-        if modifier: block.append(([note], modifier, speed))
-        else: block.append(([note], speed))
-    if sustain_time > 0: block.append((["REST"], sustain_time))
-    return block
+        if modifier: yield ([note], modifier, speed)
+        else: yield ([note], speed)
+    if sustain_time > 0: yield (["REST"], sustain_time)
+
+def strum(chord, duration=1.0, speed=0.05, modifier=None):
+    return list(iter_strum(chord, duration, speed, modifier))
+
+def iter_chug(notes_list, count, duration=0.25):
+    for _ in range(count): yield (notes_list, duration)
 
 def chug(notes_list, count, duration=0.25):
-    block = []
-    for _ in range(count): block.append((notes_list, duration))
-    return block
+    return list(iter_chug(notes_list, count, duration))
 
 def rest(duration):
     return [(["REST"], duration)]
 
-def style_apply(pattern, style_level="base", scale=SCALES["YU"]):
-    new_pattern = []
+def iter_style_apply(pattern, style_level="base", scale=SCALES["YU"], rng=None):
+    rng = rng or random
     for instruction in pattern:
         if len(instruction) == 3: notes, modifier, duration = instruction
         elif len(instruction) == 2: notes, duration = instruction; modifier = None
         else: continue
         
         if notes == ["REST"]:
-            new_pattern.append(instruction)
+            yield instruction
             continue
 
         if style_level == 'virtuoso':
             # Reduced probability of crazy fills to keep it grounded
-            if duration >= 1.0 and random.random() > 0.6:
+            if duration >= 1.0 and rng.random() > 0.6:
                 scale_segment = [n for n in scale if n in ALL_NOTES[5:15]]
-                fill_notes = random.sample(scale_segment, k=3)
-                new_pattern.extend(arpeggio(fill_notes, 0.125, 'up'))
-                new_pattern.append((random.choice(notes), 'SHIFT', 0.5))
-            else: new_pattern.append(instruction)
+                fill_notes = rng.sample(scale_segment, k=3)
+                yield from iter_arpeggio(fill_notes, 0.125, 'up')
+                yield (rng.choice(notes), 'SHIFT', 0.5)
+            else: yield instruction
         
         elif style_level == 'expressive':
-            if random.random() < 0.3:
-                new_pattern.extend(slide(notes[0], notes[0], duration)) 
-            else: new_pattern.append(instruction)
+            if rng.random() < 0.3:
+                yield from slide(notes[0], notes[0], duration)
+            else: yield instruction
 
         elif style_level == 'standard':
-            new_pattern.append(instruction)
+            yield instruction
         
         elif style_level == 'mute':
-            if random.random() > 0.7: new_pattern.append((["REST"], duration))
-            else: new_pattern.append(instruction)
-        else: new_pattern.append(instruction)
-            
-    return new_pattern
+            if rng.random() > 0.7: yield (["REST"], duration)
+            else: yield instruction
+        else: yield instruction
+
+def style_apply(pattern, style_level="base", scale=SCALES["YU"], rng=None):
+    return list(iter_style_apply(pattern, style_level, scale, rng))
+
+# ==========================================
+# SHARED BLOCKS
+# ==========================================
+# A Block is an immutable node holding instructions and/or other Blocks. Adding
+# or repeating Blocks links the existing nodes instead of copying their
+# instructions, so a song built from Blocks is a tree of shared segments whose
+# size grows with its unique material. Iterating a Block flattens it lazily in
+# the usual instruction format, so it can be returned as 'notes', passed to
+# t.extend() or fed to any iter_* helper.
+# The block_* helpers are memoized versions of the list helpers: the same
+# arguments (and, for randomized ones, the same rng state) return the same
+# Block object.
+
+def _freeze(value):
+    """Lists (at any depth) -> tuples, so arguments and instructions can be hashed."""
+    if isinstance(value, (list, tuple)) and not isinstance(value, Block): return tuple(_freeze(v) for v in value)
+    return value
+
+def _is_instruction(part):
+    return isinstance(part, (list, tuple)) and len(part) in (2, 3, 4) and isinstance(part[-1], (int, float))
+
+def _beats(instruction):
+    return instruction[2] * instruction[3] if len(instruction) == 4 else instruction[-1]
+
+def _thaw(instruction):
+    """A stored instruction back in the usual format, with a fresh notes list."""
+    notes = instruction[0]
+    if isinstance(notes, tuple): notes = list(notes)
+    return (notes,) + instruction[1:]
+
+class Block:
+    """
+    Immutable, hashable tree of instructions. Block(part, ...) takes instructions,
+    iterables of instructions and other Blocks; Blocks are linked, not copied.
+    Equality and hashing are structural.
+    """
+    __slots__ = ("parts", "times", "_len", "_beats", "_hash")
+
+    def __init__(self, *parts, times=1):
+        items = []
+        for part in parts:
+            if isinstance(part, Block) or _is_instruction(part): items.append(_freeze(part))
+            else:
+                items.extend(p if isinstance(p, Block) else _freeze(p) for p in part)
+        self.parts = tuple(items)
+        self.times = times
+        self._len = times * sum(len(p) if isinstance(p, Block) else 1 for p in self.parts)
+        self._beats = times * sum(p.beats if isinstance(p, Block) else _beats(p) for p in self.parts)
+        self._hash = hash((self.parts, times))
+
+    def __iter__(self):
+        for _ in range(self.times):
+            for part in self.parts:
+                if isinstance(part, Block): yield from part
+                else: yield _thaw(part)
+
+    def __len__(self): return self._len
+    def __hash__(self): return self._hash
+    def __eq__(self, other):
+        if self is other: return True
+        return isinstance(other, Block) and self._hash == other._hash and (self.parts, self.times) == (other.parts, other.times)
+    def __add__(self, other): return Block(self, other)
+    def __radd__(self, other): return Block(other, self)
+    def __mul__(self, count): return Block(self, times=count)
+    def __repr__(self): return f"Block({len(self)} instructions, {self.beats:g} beats)"
+
+    @property
+    def beats(self): return self._beats
+
+    def repeat(self, count): return self * count
+
+    def unique_instructions(self):
+        """Instructions actually stored in the tree, counting each shared node once."""
+        seen, total, pending = set(), 0, [self]
+        while pending:
+            node = pending.pop()
+            if id(node) in seen: continue
+            seen.add(id(node))
+            for part in node.parts:
+                if isinstance(part, Block): pending.append(part)
+                else: total += 1
+        return total
+
+def _memoized(helper):
+    """Wraps a deterministic helper so equal arguments return one shared Block."""
+    @lru_cache(maxsize=BLOCK_CACHE_SIZE)
+    def build(args, kwargs):
+        return Block(helper(*args, **dict(kwargs)))
+
+    @wraps(helper)
+    def block_helper(*args, **kwargs):
+        return build(_freeze(args), _freeze(sorted(kwargs.items())))
+
+    block_helper.cache_info = build.cache_info
+    block_helper.cache_clear = build.cache_clear
+    return block_helper
+
+@_memoized
+def block_tremolo(notes_list, duration, modifier=None, speed=0.125):
+    return iter_tremolo(notes_list, duration, modifier, speed)
+
+@_memoized
+def block_dynamic_tremolo(notes_list, duration, modifier=None, start_speed=0.25, end_speed=0.05):
+    return iter_dynamic_tremolo(notes_list, duration, modifier, start_speed, end_speed)
+
+@_memoized
+def block_strum(chord, duration=1.0, speed=0.05, modifier=None):
+    return iter_strum(chord, duration, speed, modifier)
+
+@_memoized
+def block_chug(notes_list, count, duration=0.25):
+    return iter_chug(notes_list, count, duration)
+
+@_memoized
+def block_slide(start_note, end_note, duration):
+    return slide(start_note, end_note, duration)
+
+@_memoized
+def block_ornament(note, duration, type="trill"):
+    return ornament(note, duration, type)
+
+@_memoized
+def block_rest(duration):
+    return rest(duration)
+
+def _unfreeze(value):
+    if isinstance(value, tuple): return [_unfreeze(v) for v in value]
+    return value
+
+def _memoized_random(helper):
+    """
+    _memoized() for a helper that draws from rng. Only a RandomStreams is cached, keyed on
+    its seed and position; a hit skips the stream past the words the helper drew, so cached
+    and uncached builds draw the same notes. Other generators (and the global 'random')
+    never repeat a state, so those calls are built directly.
+    """
+    current = threading.local()     # Per thread, the stream the build below draws from
+
+    @lru_cache(maxsize=BLOCK_CACHE_SIZE)
+    def build(args, kwargs, position):
+        rng = current.streams[-1]
+        start = rng.words
+        block = Block(helper(*_unfreeze(args), rng=rng, **{k: _unfreeze(v) for k, v in kwargs}))
+        return block, rng.words - start
+
+    @wraps(helper)
+    def block_helper(*args, rng=None, **kwargs):
+        position = rng.position() if isinstance(rng, RandomStreams) else None
+        if position is None: return Block(helper(*args, rng=rng, **kwargs))
+        streams = current.__dict__.setdefault("streams", [])
+        streams.append(rng)
+        try:
+            block, words = build(_freeze(args), _freeze(sorted(kwargs.items())), position)
+        finally:
+            streams.pop()
+        if rng.words == position[1]: rng.skip(words)      # Cache hit: draw as the build did
+        return block
+
+    block_helper.cache_info = build.cache_info
+    block_helper.cache_clear = build.cache_clear
+    return block_helper
+
+@_memoized
+def _block_arpeggio(chord, note_duration, direction, modifier):
+    return iter_arpeggio(chord, note_duration, direction, modifier)
+
+@_memoized_random
+def _block_arpeggio_random(chord, note_duration, modifier, rng=None):
+    return iter_arpeggio(chord, note_duration, 'random', modifier, rng)
+
+def block_arpeggio(chord, note_duration=0.25, direction='up', modifier=None, rng=None):
+    if direction == 'random': return _block_arpeggio_random(chord, note_duration, modifier, rng=rng)
+    return _block_arpeggio(chord, note_duration, direction, modifier)
+
+@_memoized_random
+def block_develop_motif(motif, evolution="variation", scale=SCALES["YU"], rng=None):
+    return iter_develop_motif(motif, evolution, scale, rng)
+
+@_memoized_random
+def block_extend_motif(motif, add_count=2, scale=SCALES["YU"], rng=None):
+    return iter_extend_motif(motif, add_count, scale, rng)
+
+@_memoized_random
+def block_mutate_rhythm(motif, rng=None):
+    return iter_mutate_rhythm(motif, rng)
+
+@_memoized_random
+def block_progressive_repeat(motif, count, scale=SCALES["YU"], rng=None):
+    return iter_progressive_repeat(motif, count, scale, rng)
+
+@_memoized_random
+def block_style_apply(pattern, style_level="base", scale=SCALES["YU"], rng=None):
+    return iter_style_apply(pattern, style_level, scale, rng)
+
+# ==========================================
+# VECTORISED SEQUENCES (NumPy)
+# ==========================================
+# NoteSequence holds a block of instructions as a structured array, one row per
+# instruction: a 21-bit note mask (bit i = ALL_NOTES[i], 0 = REST), a modifier
+# code (MODIFIERS) and a duration in beats. Pitch transforms are per-note index
+# maps applied to every row at once, so bulk generation never walks notes in
+# Python. Random transforms draw from a NumPy generator seeded from 'random',
+# so they stay reproducible under the Songwriter's seed.
+
+NOTE_DTYPE = [("mask", "<u4"), ("mod", "u1"), ("duration", "<f8")]
+
+def _require_numpy():
+    if np is None: raise ImportError("NoteSequence requires NumPy (pip install numpy)")
+
+def _pool_positions(scale):
+    """Per note index: (pool as ALL_NOTES indices, position in it), the same pools develop_motif uses."""
+    scale_idx = [NOTE_INDEX[n] for n in scale if n in NOTE_INDEX]
+    pools = []
+    for i, note in enumerate(ALL_NOTES):
+        if note in scale: pools.append((scale_idx, scale.index(note)))
+        else: pools.append((list(range(len(ALL_NOTES))), i))
+    return pools
+
+def _step_table(scale):
+    """targets[s + 1, i] = index of note i moved s steps (-1, 0, +1) within its pool."""
+    table = np.zeros((3, len(ALL_NOTES)), dtype=np.uint32)
+    for i, (pool, pos) in enumerate(_pool_positions(scale)):
+        for s in (-1, 0, 1):
+            table[s + 1, i] = pool[max(0, min(len(pool) - 1, pos + s))]
+    return table
+
+def _inversion_table(scale):
+    table = np.zeros(len(ALL_NOTES), dtype=np.uint32)
+    for i, (pool, pos) in enumerate(_pool_positions(scale)):
+        midpoint = len(pool) // 2
+        table[i] = pool[max(0, min(len(pool) - 1, midpoint - (pos - midpoint)))]
+    return table
+
+def _snap_table(scale):
+    """Nearest scale note for every note index (ties resolve downwards)."""
+    scale_idx = [NOTE_INDEX[n] for n in scale if n in NOTE_INDEX]
+    return np.array([min(scale_idx, key=lambda s: (abs(s - i), s)) for i in range(len(ALL_NOTES))], dtype=np.uint32)
+
+def _numpy_rng(rng):
+    if np is not None and isinstance(rng, np.random.Generator): return rng
+    return np.random.default_rng((rng or random).getrandbits(64))
+
+class NoteSequence:
+    """
+    A block of instructions backed by a NOTE_DTYPE structured array.
+    Build one with NoteSequence.from_instructions(...); iterating it yields
+    instructions in the usual tuple format, so it can be passed to t.extend().
+    """
+    def __init__(self, data):
+        _require_numpy()
+        self.data = data
+
+    @classmethod
+    def from_instructions(cls, instructions):
+        _require_numpy()
+        rows = []
+        for instruction in instructions:
+            count = 1
+            if len(instruction) == 4: notes, modifier, duration, count = instruction     # Run-length entry
+            elif len(instruction) == 3: notes, modifier, duration = instruction
+            else: notes, duration = instruction; modifier = None
+            if isinstance(notes, str): notes = [notes]
+            mask = 0
+            for n in notes:
+                if n == "REST": continue
+                if n not in NOTE_INDEX: raise ValueError(f"Unknown note '{n}'")
+                mask |= 1 << NOTE_INDEX[n]
+            rows.extend([(mask, MODIFIER_CODES.get(modifier, 0), duration)] * count)
+        return cls(np.array(rows, dtype=NOTE_DTYPE))
+
+    def to_instructions(self):
+        decoded = {}
+        block = []
+        for mask, mod, duration in self.data.tolist():
+            if mask not in decoded:
+                decoded[mask] = [n for i, n in enumerate(ALL_NOTES) if mask >> i & 1] or ["REST"]
+            notes = list(decoded[mask])
+            if mod: block.append((notes, MODIFIERS[mod], duration))
+            else: block.append((notes, duration))
+        return block
+
+    def __iter__(self): return iter(self.to_instructions())
+    def __len__(self): return len(self.data)
+    def __add__(self, other): return NoteSequence(np.concatenate([self.data, _as_sequence(other).data]))
+
+    def total_beats(self): return float(self.data["duration"].sum())
+    def repeat(self, count): return NoteSequence(np.tile(self.data, count))
+
+    def _remap(self, targets):
+        """New sequence with every note i moved to targets[..., i] (one map, or one map per row)."""
+        masks = self.data["mask"]
+        out = np.zeros_like(masks)
+        for i in range(len(ALL_NOTES)):
+            has = (masks >> np.uint32(i)) & np.uint32(1)
+            out |= np.left_shift(has, targets[..., i].astype(np.uint32))
+        data = self.data.copy()
+        data["mask"] = out
+        return NoteSequence(data)
+
+    def vary(self, scale=SCALES["YU"], rng=None):
+        """develop_motif(..., 'variation'): every note steps -1/0/+1 within its pool."""
+        shifts = _numpy_rng(rng).integers(0, 3, size=(len(self.data), len(ALL_NOTES)))
+        return self._remap(_step_table(scale)[shifts, np.arange(len(ALL_NOTES))])
+
+    def invert(self, scale=SCALES["YU"]):
+        """develop_motif(..., 'inversion')."""
+        return self._remap(_inversion_table(scale))
+
+    def expand(self):
+        """develop_motif(..., 'expansion'): L -> M, M -> H, H stays."""
+        table = np.array([i + 7 if i < 14 else i for i in range(len(ALL_NOTES))], dtype=np.uint32)
+        return self._remap(table)
+
+    def snap_to_scale(self, scale=SCALES["YU"]):
+        return self._remap(_snap_table(scale))
+
+    def shuffle_rhythm(self, rng=None):
+        """mutate_rhythm(): same notes, durations permuted."""
+        data = self.data.copy()
+        data["duration"] = _numpy_rng(rng).permutation(data["duration"])
+        return NoteSequence(data)
+
+    def extend(self, add_count=2, scale=SCALES["YU"], rng=None):
+        """extend_motif(): appends add_count random scale notes of 0.5 or 0.25 beats."""
+        g = _numpy_rng(rng)
+        scale_idx = np.array([NOTE_INDEX[n] for n in scale if n in NOTE_INDEX], dtype=np.uint32)
+        tail = np.zeros(add_count, dtype=NOTE_DTYPE)
+        tail["mask"] = np.left_shift(np.uint32(1), g.choice(scale_idx, size=add_count))
+        tail["duration"] = g.choice([0.5, 0.25], size=add_count)
+        return NoteSequence(np.concatenate([self.data, tail]))
+
+def _as_sequence(block):
+    return block if isinstance(block, NoteSequence) else NoteSequence.from_instructions(block)
+
+# ==========================================
+# ARRANGEMENT
+# ==========================================
+
+def arrange(*sections):
+    """
+    Joins (name, notes) sections into one list. Returns (notes, markers), where markers
+    is [[name, start beat], ...] for the song's 'markers' key, so Bard can seek to them.
+    If every section is a Block, notes is a Block linking them instead of a list.
+    """
+    if sections and all(isinstance(part, Block) for _, part in sections):
+        markers, beat = [], 0.0
+        for name, part in sections:
+            markers.append([name, round(beat, 9)])
+            beat += part.beats
+        return Block(*(part for _, part in sections)), markers
+
+    notes, markers, beat = [], [], 0.0
+    for name, part in sections:
+        markers.append([name, round(beat, 9)])
+        for instruction in part:
+            notes.append(instruction)
+            beat += _beats(instruction)
+    return notes, markers
 
 def check_length(notes, bpm=120):
-    total_beats = sum(n[-1] for n in notes)
+    total_beats = sum(_beats(n) for n in notes)
     seconds = total_beats * (60.0 / bpm)
-    print(f"Section Length: {seconds:.1f} seconds ({total_beats} beats at {bpm} BPM)")
\ No newline at end of file
+    print(f"Section Length: {seconds:.1f} seconds ({total_beats} beats at {bpm} BPM)")
@@ -0,0 +1,207 @@
+"""
+Render.py
+Offline audition: renders compiled songs to WAV files without the game.
+v1.0: Plucked-string synth (Karplus-Strong, NumPy) over the L/M/H 21-key grid.
+      - Songs go through Bard.compile_song, so what you hear is the Program the Bard would
+        play: humanized timing, modifier leads and sections included.
+      - SHIFT / CTRL strikes slide a semitone up / down from the plain note.
+      - Each string is synthesized once per pluck variant, period by period across every
+        variant at once, and strikes are mixed from those buffers; a re-struck string is damped.
+      - With no arguments every song in songs/ is rendered to renders/; --jobs renders in
+        worker processes.
+v1.1: Renders go through Songwriter.run_isolated: an error or a dead worker only fails its
+      own song, and WAVs are written via .tmp files.
+Last Update: 2026-10-17
+"""
+import os
+import sys
+import time
+import wave
+import argparse
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # Checked in render_file, so the module still imports without it
+
+import MusicUtils as utils
+import SongLibrary
+import Songwriter
+import Bard
+
+# CONFIG
+RENDER_DIR = "renders"
+SAMPLE_RATE = 44100
+BASE_FREQ = 261.63              # M1 (middle C); L is an octave below, H an octave above
+DEGREE_SEMITONES = (0, 2, 4, 5, 7, 9, 11)
+MODIFIER_SEMITONES = {"SHIFT": 1, "CTRL": -1}
+SLIDE_SEC = 0.04                # Glide from the plain note to a modifier's pitch
+RING_SEC = 3.0                  # Longest a string rings after a strike
+DECAY_SEC = 1.5                 # Time for a string to fall by 60 dB
+DAMP_SEC = 0.02                 # Fade when a ringing string is struck again
+TAIL_SEC = 1.0                  # Silence left after the last beat
+PLUCK_VARIANTS = 4              # Noise bursts per string, cycled so repeats don't sound sampled
+PEAK = 0.8                      # Output is normalized to this peak
+SEED = 0
+
+NOTE_CODES = {Bard.KEYS[note]: i for i, note in enumerate(utils.ALL_NOTES)}
+MODIFIER_BENDS = {bit: MODIFIER_SEMITONES[name] for name, bit in
+                  ((name, Bard.MODIFIER_BITS[Bard.KEYS[name]]) for name in MODIFIER_SEMITONES)}
+
+def _require_numpy():
+    if np is None: raise ImportError("Render.py requires NumPy (pip install numpy)")
+
+def note_freq(index):
+    """Frequency (Hz) of ALL_NOTES[index]."""
+    octave, degree = divmod(index, len(DEGREE_SEMITONES))
+    return BASE_FREQ * 2.0 ** (octave - 1 + DEGREE_SEMITONES[degree] / 12.0)
+
+def strikes(program):
+    """Yields (time_sec, note_index, bend_semitones) for every note pressed in a Program."""
+    for i, (target, action, codes) in enumerate(program.events()):
+        if action != Bard.EV_PRESS: continue
+        state = program.modifier_state[i]
+        for code in codes:      # A modifier coalesced onto its note is already down
+            state |= Bard.MODIFIER_BITS.get(code, 0)
+        bend = sum(semitones for bit, semitones in MODIFIER_BENDS.items() if state & bit)
+        for code in codes:
+            if code in NOTE_CODES: yield target / 1e9, NOTE_CODES[code], bend
+
+# ==========================================
+# SYNTH
+# ==========================================
+# Karplus-Strong: a noise burst one period long, fed back through a two-tap
+# average. Sample n only depends on samples a period or more back, so a whole
+# period is computed per NumPy step, for every pluck variant at once. The
+# average delays the loop by half a sample, and periods are whole samples, so
+# strikes are resampled to the exact pitch while they're mixed.
+
+def pluck(freq, variants=PLUCK_VARIANTS, seconds=RING_SEC, rate=SAMPLE_RATE, rng=None):
+    """
+    Returns (buffers, rate_ratio): variants x samples of string at roughly freq, and the
+    playback-rate factor that puts it exactly on freq.
+    """
+    rng = rng or np.random.default_rng(SEED)
+    period = max(2, int(rate / freq - 0.5))
+    length = int(seconds * rate * 2 ** (1 / 12)) + period    # Room for a bend upwards
+    loss = 10.0 ** (-3.0 * period / (rate * DECAY_SEC))
+
+    y = np.zeros((variants, length + 1))    # Column 0 stays silent: the tap before the burst
+    burst = rng.uniform(-1.0, 1.0, (variants, period))
+    y[:, 1:period + 1] = burst - burst.mean(axis=1, keepdims=True)
+    for start in range(period + 1, length + 1, period):
+        stop = min(start + period, length + 1)
+        prev = y[:, start - period:stop - period]
+        prev_1 = y[:, start - period - 1:stop - period - 1]
+        y[:, start:stop] = loss * 0.5 * (prev + prev_1)
+    return y[:, 1:], freq / (rate / (period + 0.5))
+
+def strike_wave(buffer, ratio, bend, samples, rate=SAMPLE_RATE):
+    """samples of buffer played back at ratio, sliding bend semitones over SLIDE_SEC."""
+    if bend:
+        slide = min(samples, int(SLIDE_SEC * rate))
+        steps = np.full(samples, ratio * 2.0 ** (bend / 12.0))
+        steps[:slide] = ratio * 2.0 ** (bend / 12.0 * np.linspace(0.0, 1.0, slide, endpoint=False))
+        phase = np.concatenate(([0.0], np.cumsum(steps[:-1])))
+    else:
+        phase = np.arange(samples) * ratio
+    return np.interp(phase, np.arange(len(buffer)), buffer, right=0.0)
+
+def render(program, rate=SAMPLE_RATE):
+    """Renders a Program to a float array in [-PEAK, PEAK]."""
+    _require_numpy()
+    hits = sorted(strikes(program))
+    total = int((program.duration + Bard.MOD_LEAD_TIME + TAIL_SEC) * rate)
+    out = np.zeros(total)
+    strings = {}
+    next_strike = {}    # Per string, the start sample of its following strike
+    ring = int(RING_SEC * rate)
+    damp = max(1, int(DAMP_SEC * rate))
+
+    starts = [int(seconds * rate) for seconds, _, _ in hits]
+    following = [total] * len(hits)
+    for k in range(len(hits) - 1, -1, -1):
+        note = hits[k][1]
+        following[k] = next_strike.get(note, total)
+        next_strike[note] = starts[k]
+
+    for k, ((_, note, bend), start) in enumerate(zip(hits, starts)):
+        if note not in strings: strings[note] = pluck(note_freq(note), rate=rate, rng=np.random.default_rng(SEED + note))
+        buffers, ratio = strings[note]
+        samples = min(ring, following[k] - start + damp, total - start)
+        if samples <= 0: continue
+        wave_ = strike_wave(buffers[k % len(buffers)], ratio, bend, samples, rate)
+        cut = following[k] - start
+        if cut < samples: wave_[cut:] *= np.linspace(1.0, 0.0, samples - cut)
+        out[start:start + samples] += wave_
+
+    peak = np.abs(out).max() if len(out) else 0.0
+    if peak > 0: out *= PEAK / peak
+    return out
+
+def write_wav(path, samples, rate=SAMPLE_RATE):
+    """Writes a float array as 16-bit mono PCM, via a .tmp file so a crash leaves no partial WAV."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(path + ".tmp", 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(pcm.tobytes())
+    os.replace(path + ".tmp", path)
+
+def wav_path(path, out_dir=RENDER_DIR):
+    return os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + ".wav")
+
+def render_file(path, out_dir=RENDER_DIR, rate=SAMPLE_RATE):
+    """Compiles and renders one song. Returns (wav_path, song_seconds, render_seconds)."""
+    _require_numpy()
+    t0 = time.perf_counter()
+    program = Bard.compile_song(path)
+    samples = render(program, rate)
+    out_path = wav_path(path, out_dir)
+    write_wav(out_path, samples, rate)
+    return out_path, program.duration, time.perf_counter() - t0
+
+def render_job(path, out_dir=RENDER_DIR, rate=SAMPLE_RATE):
+    """render_file() that returns (result, None), or (None, message) for a bad song."""
+    try:
+        return render_file(path, out_dir, rate), None
+    except Bard.SongError as e:
+        return None, str(e)
+
+def render_all(paths, jobs, out_dir=RENDER_DIR, rate=SAMPLE_RATE):
+    """
+    Yields (path, result, error) in the order of paths, like Songwriter.compile_all: any
+    failure, even a dead worker, only fails its own song (see Songwriter.run_isolated).
+    """
+    for path, outcome, error in Songwriter.run_isolated(render_job, paths, jobs, out_dir, rate):
+        if error is None:
+            yield (path, *outcome)
+            continue
+        Songwriter.discard_tmp([wav_path(path, out_dir)])
+        yield path, None, f"{path}: render failed\n{error}"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renders songs to WAV with a plucked-string synth.")
+    parser.add_argument("songs", nargs="*", help=f"song files (default: every song in '{SongLibrary.SONGS_DIR}/')")
+    parser.add_argument("-o", "--out", default=RENDER_DIR, help=f"output folder (default '{RENDER_DIR}/')")
+    parser.add_argument("--rate", type=int, default=SAMPLE_RATE, help="sample rate in Hz")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="render in N worker processes (0 = one per CPU)")
+    args = parser.parse_args()
+    if np is None: sys.exit("[!] Render.py requires NumPy (pip install numpy)")
+
+    paths = args.songs or SongLibrary.list_song_files()
+    if not paths: sys.exit(f"[!] No songs found in '{SongLibrary.SONGS_DIR}/'.")
+    if not os.path.exists(args.out): os.makedirs(args.out)
+
+    failed = 0
+    for path, result, error in render_all(paths, args.jobs or os.cpu_count(), args.out, args.rate):
+        if error:
+            failed += 1
+            print(f"[!] {error}")
+            continue
+        out_path, seconds, elapsed = result
+        print(f"[√] {out_path}: {Bard.format_time(seconds)} in {elapsed:.2f}s (x{seconds / max(elapsed, 1e-9):.0f} real time)")
+    if failed:
+        print(f"[!] {failed} of {len(paths)} song(s) failed to render.")
+        sys.exit(1)
@@ -0,0 +1,544 @@
+"""
+SongFormat.py
+Compact binary song format (.bard) shared by Songwriter and Bard.
+v1.0: Initial format.
+      - Header: magic, version, BPM, event count, total beats, duration and title.
+      - Fixed-width records: 21-key note bitmask, modifier code, duration in beats.
+      - Run directly to convert existing JSON songs: python SongFormat.py [files...]
+v1.1: BinaryWriter streams records to disk, so songs never have to be held in memory.
+v1.2: Multi-track songs are k-way merged into one stream (merge_tracks) instead of
+      playing only Lead_Melody.
+v1.3: check_instruction() validates instructions; unknown notes or modifiers are errors.
+v1.4: Run-length instructions [notes, modifier, duration, count] strike the same chord
+      count times, duration beats apart. .bard files store them expanded.
+v2.0: Section markers ('markers': [[name, start beat], ...]) are stored in a trailer after
+      the records. Version 1 files are still read.
+v3.0: Structured songs. 'sections' ({name: [instructions]}) holds shared material and
+      {"section": name, "repeat": n} entries play it in place; .bard files store each
+      section once plus reference records. Both expand lazily while being read.
+v4.0: Run-length records. A strike repeated count times is one record with count - 1 in the
+      mask bits above the notes, so repeats cost no more space than sections do.
+Last Update: 2026-10-17
+"""
+import os
+import sys
+import json
+import glob
+import mmap
+import struct
+import heapq
+import math
+
+from MusicUtils import ALL_NOTES, MODIFIERS, MODIFIER_CODES
+
+# ==========================================
+# LAYOUT
+# ==========================================
+MAGIC = b"BARD"
+VERSION = 4
+READ_VERSIONS = (1, 2, 3, 4)
+BINARY_EXT = ".bard"
+
+# magic, version, bpm, event count, total beats, duration (s), title length (utf-8 bytes)
+HEADER = struct.Struct("<4sHdIddH")
+# note bitmask (bit i = ALL_NOTES[i]), modifier code, duration (beats)
+RECORD = struct.Struct("<IBd")
+# v2 trailer: marker count, then per marker its start (beats) and name length + utf-8 name
+MARKER_COUNT = struct.Struct("<H")
+MARKER = struct.Struct("<dH")
+# v3 section table (after the title): stored record count, section count, then per
+# section its record count and name length + utf-8 name. Section records come first,
+# in table order, followed by the song body. The header's event count is the expanded one.
+STRUCTURE = struct.Struct("<IH")
+SECTION = struct.Struct("<IH")
+# A record with this modifier code plays section number <mask> <duration> times
+REF_MODIFIER = 0xFF
+
+NOTE_BITS = {note: 1 << i for i, note in enumerate(ALL_NOTES)}
+# v4: other records strike (mask >> RUN_SHIFT) + 1 times; longer runs take several records
+RUN_SHIFT = len(ALL_NOTES)
+NOTE_MASK = (1 << RUN_SHIFT) - 1
+MAX_RUN = 1 << (32 - RUN_SHIFT)      # Strikes per run record (the mask is 32 bits)
+
+# ==========================================
+# PLAYER TIMING
+# ==========================================
+# Bard plays to these and the Songwriter checks songs against them, so they
+# live here rather than in Bard, which the Songwriter doesn't need to load.
+PRESS_DURATION = 0.03   # Short reliable tap
+MOD_LEAD_TIME = 0.05    # Time to hold Shift before pressing note
+TRACE_SECTION_SEC = 15  # Breakdown window length for songs without section markers
+
+# ==========================================
+# INSTRUCTIONS
+# ==========================================
+
+def parse_instruction(instruction):
+    """Splits a JSON instruction into (notes, modifier, duration). Run-length entries give one strike."""
+    if len(instruction) == 4: notes, modifier, duration, _ = instruction
+    elif len(instruction) == 3: notes, modifier, duration = instruction
+    else: notes, duration = instruction; modifier = None
+    if isinstance(notes, str): notes = [notes]
+    return notes, modifier, duration
+
+def run_count(instruction):
+    """How many times an instruction strikes (1 unless it is a run-length entry)."""
+    return instruction[3] if len(instruction) == 4 else 1
+
+def instruction_beats(instruction):
+    if len(instruction) == 4: return instruction[2] * instruction[3]
+    return instruction[-1]
+
+def expand_runs(instructions):
+    """Yields instructions with every run-length entry expanded into plain strikes."""
+    for instruction in instructions:
+        if len(instruction) != 4:
+            yield instruction
+            continue
+        notes, modifier, duration, count = instruction
+        strike = [notes, modifier, duration] if modifier else [notes, duration]
+        for _ in range(count): yield strike
+
+def check_instruction(instruction):
+    """
+    Validates one instruction and returns (notes, modifier, duration, count).
+    Raises ValueError describing the first problem found.
+    """
+    if not isinstance(instruction, (list, tuple)) or len(instruction) not in (2, 3, 4):
+        raise ValueError(f"expected [notes, duration], [notes, modifier, duration] or [notes, modifier, duration, count], got {instruction!r}")
+    notes, modifier, duration = parse_instruction(instruction)
+    count = run_count(instruction)
+    if not isinstance(notes, (list, tuple)): raise ValueError(f"notes must be a list, got {notes!r}")
+    unknown = [n for n in notes if n != "REST" and n not in NOTE_BITS]
+    if unknown: raise ValueError(f"unknown note(s) {unknown}")
+    if modifier not in MODIFIER_CODES: raise ValueError(f"unknown modifier {modifier!r}")
+    if isinstance(duration, bool) or not isinstance(duration, (int, float)) or not math.isfinite(duration) or duration < 0:
+        raise ValueError(f"bad duration {duration!r}")
+    if isinstance(count, bool) or not isinstance(count, int) or count < 1: raise ValueError(f"bad run count {count!r}")
+    return notes, modifier, duration, count
+
+def notes_to_mask(notes):
+    mask = 0
+    for n in notes:
+        if n == "REST": continue
+        if n not in NOTE_BITS: raise ValueError(f"Unknown note '{n}'")
+        mask |= NOTE_BITS[n]
+    return mask
+
+def mask_to_notes(mask):
+    if not mask: return ["REST"]
+    return [note for i, note in enumerate(ALL_NOTES) if mask >> i & 1]
+
+def song_tracks(song_data):
+    """A multi-track song's {name: instructions}, checked to be an object of named tracks."""
+    tracks = song_data['tracks']
+    if not isinstance(tracks, dict): raise ValueError(f"'tracks' must be an object of {{name: notes}}, got {type(tracks).__name__}")
+    return tracks
+
+def song_notes(song_data, stats=None):
+    """The instructions Bard plays from a JSON song. Sections and multi-track songs are expanded lazily."""
+    sections = song_sections(song_data)
+    if 'notes' in song_data:
+        return expand_sections(song_data['notes'], sections) if sections else song_data['notes']
+    if 'tracks' in song_data:
+        tracks = song_tracks(song_data)
+        if sections: tracks = {name: expand_sections(track, sections) for name, track in tracks.items()}
+        return merge_tracks(tracks, stats)
+    return []
+
+def check_markers(markers):
+    """Validates a song's 'markers' and returns them as (name, start beat) tuples in song order."""
+    checked = []
+    for marker in markers or ():
+        if not isinstance(marker, (list, tuple)) or len(marker) != 2: raise ValueError(f"expected [name, beat] marker, got {marker!r}")
+        name, beat = marker
+        if not isinstance(name, str) or not name: raise ValueError(f"bad marker name {name!r}")
+        if isinstance(beat, bool) or not isinstance(beat, (int, float)) or not math.isfinite(beat) or beat < 0:
+            raise ValueError(f"bad marker beat {beat!r} for '{name}'")
+        checked.append((name, float(beat)))
+    if len(checked) > 0xFFFF: raise ValueError("too many markers")
+    return sorted(checked, key=lambda marker: marker[1])
+
+def song_beats(song_data):
+    """Length of a JSON song in beats (the longest track for multi-track songs)."""
+    sections, cache = song_sections(song_data), {}
+    if 'notes' in song_data: return structure_total(song_data['notes'], sections, instruction_beats, cache)
+    if 'tracks' in song_data: return max((structure_total(t, sections, instruction_beats, cache) for t in song_tracks(song_data).values()), default=0)
+    return 0
+
+def song_events(song_data):
+    """Strikes Bard plays for a JSON song."""
+    if 'notes' in song_data: return structure_total(song_data['notes'], song_sections(song_data), run_count, {})
+    return sum(run_count(i) for i in song_notes(song_data))
+
+# ==========================================
+# SECTIONS
+# ==========================================
+# A song may keep repeated material once under 'sections' and play it with
+# {"section": name, "repeat": n} entries ("repeat" defaults to 1), anywhere an
+# instruction can go, including inside other sections. Nothing is unrolled on
+# load: expand_sections() yields the played instructions one at a time, and
+# lengths and counts are summed per section, once.
+
+def song_sections(song_data):
+    sections = song_data.get('sections') or {}
+    if not isinstance(sections, dict): raise ValueError(f"'sections' must be a {{name: instructions}} object")
+    return sections
+
+def check_ref(entry, sections):
+    """Validates a section reference and returns (name, repeat)."""
+    name = entry.get("section")
+    repeat = entry.get("repeat", 1)
+    if name not in sections: raise ValueError(f"unknown section {name!r}")
+    if isinstance(repeat, bool) or not isinstance(repeat, int) or repeat < 1: raise ValueError(f"bad repeat count {repeat!r} for section '{name}'")
+    return name, repeat
+
+def expand_sections(entries, sections, active=()):
+    """Yields the instructions of entries with every section reference played in place."""
+    for entry in entries:
+        if not isinstance(entry, dict):
+            yield entry
+            continue
+        name, repeat = check_ref(entry, sections)
+        if name in active: raise ValueError(f"section '{name}' plays itself")
+        for _ in range(repeat):
+            yield from expand_sections(sections[name], sections, active + (name,))
+
+def structure_total(entries, sections, measure, cache, active=()):
+    """Sum of measure(instruction) over the expansion of entries. Each section is measured once into cache."""
+    total = 0
+    for entry in entries:
+        if not isinstance(entry, dict):
+            total += measure(entry)
+            continue
+        name, repeat = check_ref(entry, sections)
+        if name in active: raise ValueError(f"section '{name}' plays itself")
+        if name not in cache: cache[name] = structure_total(sections[name], sections, measure, cache, active + (name,))
+        total += cache[name] * repeat
+    return total
+
+def section_order(sections):
+    """Section names ordered so every section comes after the ones it plays."""
+    order, done = [], set()
+    def visit(name, active):
+        if name in done: return
+        if name in active: raise ValueError(f"section '{name}' plays itself")
+        for entry in sections[name]:
+            if isinstance(entry, dict): visit(check_ref(entry, sections)[0], active | {name})
+        done.add(name)
+        order.append(name)
+    for name in sections: visit(name, frozenset())
+    return order
+
+# ==========================================
+# MULTI-TRACK MERGE
+# ==========================================
+# Each track becomes a stream of absolute onsets; heapq.merge interleaves the k
+# streams in O(n log k). Strikes that land on the same beat (within ONSET_EPSILON)
+# become one chord. Conflict rule: the chord takes the modifier of the
+# highest-priority track striking at that onset (LEAD_TRACK first, then the
+# others in file order); strikes from other tracks that need a different
+# modifier are dropped, since one chord can only be played under one modifier.
+
+LEAD_TRACK = "Lead_Melody"
+ONSET_EPSILON = 1e-6
+
+def track_onsets(instructions, priority):
+    """Yields (onset_beat, priority, notes, modifier) per instruction, then an end marker with notes=None."""
+    beat = 0.0
+    for instruction in expand_runs(instructions):
+        notes, modifier, duration = parse_instruction(instruction)
+        yield beat, priority, notes, modifier
+        beat += duration
+    yield beat, priority, None, None
+
+def merge_tracks(tracks, stats=None):
+    """
+    Merges a {name: instructions} dict into one instruction stream (see rules above).
+    stats, if given, receives 'tracks', 'coalesced' (strikes folded into another
+    track's chord) and 'dropped' (strikes lost to modifier conflicts).
+    """
+    if stats is None: stats = {}
+    stats.update(tracks=len(tracks), coalesced=0, dropped=0)
+    if len(tracks) == 1:
+        yield from next(iter(tracks.values()))
+        return
+
+    names = sorted(tracks, key=lambda name: name != LEAD_TRACK)
+    streams = [track_onsets(tracks[name], p) for p, name in enumerate(names)]
+    merged = heapq.merge(*streams, key=lambda event: (event[0], event[1]))
+
+    pending = None     # (onset, notes, modifier) of the last strike, waiting to learn its duration
+    group = None       # [onset, notes, modifier, strikes] being collected at the current onset
+
+    def flush(onset):
+        p_onset, p_notes, p_mod = pending
+        duration = round(onset - p_onset, 9)
+        return (p_notes, p_mod, duration) if p_mod else (p_notes, duration)
+
+    for onset, priority, notes, modifier in merged:
+        if group is None or onset - group[0] > ONSET_EPSILON:
+            # A new onset: the previous group becomes the pending strike, unless nothing was
+            # struck there, in which case the previous strike simply rings longer.
+            if group is not None and (group[3] or pending is None):
+                if pending is not None: yield flush(group[0])
+                pending = (group[0], group[1] or ["REST"], group[2])
+            group = [onset, [], None, 0]
+        if not notes or notes == ["REST"]: continue
+
+        if group[3] == 0: group[2] = modifier
+        elif modifier != group[2]:
+            stats["dropped"] += len(notes)
+            continue
+        else: stats["coalesced"] += 1
+        group[1].extend(n for n in notes if n not in group[1])
+        group[3] += 1
+
+    # The last group is the end of the longest track
+    if group is not None and group[3]:
+        if pending is not None: yield flush(group[0])
+        pending = (group[0], group[1], group[2])
+    if pending is not None: yield flush(group[0])
+
+# ==========================================
+# READ / WRITE
+# ==========================================
+
+class BinaryWriter:
+    """
+    Streams records into a .bard file one instruction at a time. The header and section
+    table are written as placeholders first and patched with the final counts on close().
+    A structured song names its sections up front, writes each with add_section() in that
+    order (a section may only play sections before it), then adds the song body.
+    """
+    def __init__(self, path, title, bpm, markers=(), sections=()):
+        self.path = path
+        self.title = title.encode('utf-8')
+        self.bpm = bpm
+        self.markers = check_markers(markers)
+        self.names = [name.encode('utf-8') for name in sections]
+        if len(self.names) > 0xFFFF: raise ValueError("too many sections")
+        self.index = {name: i for i, name in enumerate(sections)}
+        self.sections = []      # (record count, events, beats) per written section
+        self.stored = 0
+        self.count = 0
+        self.total_beats = 0.0
+        self.file = open(path, 'wb')
+        self.file.write(self.header())
+        self.file.write(self.title)
+        self.file.write(self.table())
+
+    def header(self):
+        return HEADER.pack(MAGIC, VERSION, self.bpm, self.count, self.total_beats, self.total_beats * (60.0 / self.bpm), len(self.title))
+
+    def table(self):
+        counts = [records for records, _, _ in self.sections] + [0] * (len(self.names) - len(self.sections))
+        return STRUCTURE.pack(self.stored, len(self.names)) + b"".join(SECTION.pack(c, len(n)) + n for c, n in zip(counts, self.names))
+
+    def add(self, instruction):
+        if isinstance(instruction, dict):
+            name, repeat = check_ref(instruction, self.index)
+            if self.index[name] >= len(self.sections): raise ValueError(f"section '{name}' played before it is written")
+            _, events, beats = self.sections[self.index[name]]
+            self.file.write(RECORD.pack(self.index[name], REF_MODIFIER, repeat))
+            self.stored += 1
+            self.total_beats += beats * repeat
+            self.count += events * repeat
+            return
+        notes, modifier, duration, count = check_instruction(instruction)
+        mask, code = notes_to_mask(notes), MODIFIER_CODES[modifier]
+        for run in range(0, count, MAX_RUN):
+            self.file.write(RECORD.pack(mask | (min(count - run, MAX_RUN) - 1) << RUN_SHIFT, code, duration))
+            self.stored += 1
+        self.total_beats += duration * count
+        self.count += count
+
+    def add_section(self, name, instructions):
+        if len(self.sections) >= len(self.names) or self.names[len(self.sections)] != name.encode('utf-8'):
+            raise ValueError(f"section '{name}' written out of order")
+        first, count, total_beats = self.stored, self.count, self.total_beats
+        self.count, self.total_beats = 0, 0.0
+        for instruction in instructions:
+            self.add(instruction)
+        self.sections.append((self.stored - first, self.count, self.total_beats))
+        self.count, self.total_beats = count, total_beats
+
+    def close(self):
+        if len(self.sections) != len(self.names): raise ValueError("not every section was written")
+        self.file.write(MARKER_COUNT.pack(len(self.markers)))
+        for name, beat in self.markers:
+            data = name.encode('utf-8')
+            self.file.write(MARKER.pack(beat, len(data)) + data)
+        self.file.seek(0)
+        self.file.write(self.header())
+        self.file.seek(HEADER.size + len(self.title))
+        self.file.write(self.table())
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+        os.remove(self.path)
+
+def write_binary(path, song_data):
+    """Writes a JSON-style song dict as .bard. Returns the file size."""
+    sections = song_sections(song_data) if 'notes' in song_data else {}
+    order = section_order(sections)
+    writer = BinaryWriter(path, song_data.get('title', 'Unknown'), song_data.get('bpm', 120), song_data.get('markers'), order)
+    try:
+        for name in order:
+            writer.add_section(name, sections[name])
+        for instruction in song_data['notes'] if sections else song_notes(song_data):
+            writer.add(instruction)
+    except Exception:
+        writer.abort()
+        raise
+    writer.close()
+    return os.path.getsize(path)
+
+class BinarySong:
+    """
+    A memory-mapped .bard file. Header fields, sections and markers are attributes;
+    records() walks the fixed-width records straight out of the mapping as
+    (mask, modifier_code, duration), playing runs and section references in place.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self.version, self.bpm, self.count, self.total_beats, self.duration, title_len = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC: raise ValueError(f"{path} is not a .bard file")
+            if self.version not in READ_VERSIONS: raise ValueError(f"{path}: unsupported .bard version {self.version}")
+            version = self.version
+            self.title = self.map[HEADER.size:HEADER.size + title_len].decode('utf-8')
+            self.offset = HEADER.size + title_len
+            self.stored, self.sections, self.body = self.count, [], 0
+            if version >= 3: self.read_sections()
+            if len(self.map) < self.offset + self.stored * RECORD.size: raise ValueError(f"{path} is truncated")
+            self.markers = self.read_markers(self.offset + self.stored * RECORD.size) if version >= 2 else []
+        except Exception:
+            self.map.close()
+            raise
+
+    def read_sections(self):
+        """Reads the v3 section table into sections as (name, first record, record count)."""
+        try:
+            self.stored, count = STRUCTURE.unpack_from(self.map, self.offset)
+            pos, first = self.offset + STRUCTURE.size, 0
+            for _ in range(count):
+                records, name_len = SECTION.unpack_from(self.map, pos)
+                pos += SECTION.size
+                self.sections.append((self.map[pos:pos + name_len].decode('utf-8'), first, records))
+                pos += name_len
+                first += records
+        except (struct.error, UnicodeDecodeError):
+            raise ValueError(f"{self.path}: bad section table")
+        if first > self.stored: raise ValueError(f"{self.path}: bad section table")
+        self.offset = pos
+        self.body = first       # Index of the first song body record
+
+    def read_markers(self, pos):
+        try:
+            (count,) = MARKER_COUNT.unpack_from(self.map, pos)
+            pos += MARKER_COUNT.size
+            markers = []
+            for _ in range(count):
+                beat, name_len = MARKER.unpack_from(self.map, pos)
+                pos += MARKER.size
+                markers.append((self.map[pos:pos + name_len].decode('utf-8'), beat))
+                pos += name_len
+        except (struct.error, UnicodeDecodeError):
+            raise ValueError(f"{self.path}: bad marker trailer")
+        return markers
+
+    def stored_records(self, first, count):
+        """Records first..first+count as stored, section references included."""
+        view = memoryview(self.map)[self.offset + first * RECORD.size:self.offset + (first + count) * RECORD.size]
+        try:
+            yield from RECORD.iter_unpack(view)
+        finally:
+            view.release()
+
+    def section_ref(self, mask, duration, limit):
+        """(first, count, repeat) of a reference record; only sections below limit may be played."""
+        if mask >= limit or duration < 1 or duration != int(duration): raise ValueError(f"{self.path}: bad section reference")
+        _, first, count = self.sections[mask]
+        return first, count, int(duration)
+
+    def run(self, mask):
+        """(notes mask, strike count) of a stored record."""
+        if self.version < 4: return mask, 1
+        return mask & NOTE_MASK, (mask >> RUN_SHIFT) + 1
+
+    def expand(self, first, count, limit):
+        runs = self.version >= 4
+        for record in self.stored_records(first, count):
+            if record[1] != REF_MODIFIER:
+                if runs and record[0] > NOTE_MASK:
+                    strike = (record[0] & NOTE_MASK, record[1], record[2])
+                    for _ in range((record[0] >> RUN_SHIFT) + 1): yield strike
+                else:
+                    yield record
+                continue
+            start, length, repeat = self.section_ref(record[0], record[2], limit)
+            for _ in range(repeat):
+                yield from self.expand(start, length, record[0])
+
+    def records(self):
+        if not self.sections and self.version < 4: return self.stored_records(0, self.stored)
+        return self.expand(self.body, self.stored - self.body, len(self.sections))
+
+    def entries(self, first, count, limit):
+        """Stored records as JSON instructions and section references."""
+        entries = []
+        for mask, mod, duration in self.stored_records(first, count):
+            if mod == REF_MODIFIER:
+                _, _, repeat = self.section_ref(mask, duration, limit)
+                entries.append({"section": self.sections[mask][0], "repeat": repeat} if repeat > 1 else {"section": self.sections[mask][0]})
+                continue
+            modifier = MODIFIERS[mod]
+            mask, repeat = self.run(mask)
+            if repeat > 1: entries.append([mask_to_notes(mask), modifier, duration, repeat])
+            else: entries.append([mask_to_notes(mask), modifier, duration] if modifier else [mask_to_notes(mask), duration])
+        return entries
+
+    def to_song_data(self):
+        song_data = {"title": self.title, "bpm": self.bpm}
+        if self.markers: song_data["markers"] = [list(marker) for marker in self.markers]
+        if self.sections:
+            song_data["sections"] = {name: self.entries(first, count, i) for i, (name, first, count) in enumerate(self.sections)}
+            song_data["notes"] = self.entries(self.body, self.stored - self.body, len(self.sections))
+        else:
+            song_data["notes"] = self.entries(0, self.stored, 0)
+        return song_data
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self): return self
+    def __exit__(self, *exc): self.close()
+
+def read_header(path):
+    """Returns (title, bpm, event count, duration) without touching the records."""
+    with open(path, 'rb') as f:
+        head = f.read(HEADER.size)
+        magic, version, bpm, count, total_beats, duration, title_len = HEADER.unpack(head)
+        if magic != MAGIC: raise ValueError(f"{path} is not a .bard file")
+        return f.read(title_len).decode('utf-8'), bpm, count, duration
+
+def convert_json(json_path):
+    """Writes <name>.bard next to an existing JSON song. Returns the new path."""
+    with open(json_path, 'r') as f:
+        song_data = json.load(f)
+    bard_path = os.path.splitext(json_path)[0] + BINARY_EXT
+    size = write_binary(bard_path, song_data)
+    print(f"[+] Converted: {song_data.get('title', json_path)} -> {bard_path} ({os.path.getsize(json_path)} -> {size} bytes)")
+    return bard_path
+
+if __name__ == "__main__":
+    paths = sys.argv[1:] or glob.glob(os.path.join("songs", "*.json"))
+    for p in paths:
+        try:
+            convert_json(p)
+        except Exception as e:
+            print(f"[!] Failed to convert {p}: {e}")
@@ -0,0 +1,128 @@
+"""
+SongLibrary.py
+Persistent index of the compiled song library, shared by Songwriter and Bard.
+v1.0: Initial index.
+      - Entries hold title, BPM, duration, event count and a content hash.
+      - Keyed on path and validated against mtime/size, so only changed files are re-read.
+Last Update: 2026-10-17
+"""
+import os
+import json
+import glob
+import hashlib
+
+import SongFormat
+
+# CONFIG
+SONGS_DIR = "songs"
+INDEX_NAME = ".library.json"
+INDEX_VERSION = 1
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+_warned_stale = set()   # (json path, mtime_ns) already reported as newer than its .bard
+
+def list_song_files(songs_dir=SONGS_DIR):
+    """
+    One entry per song, preferring the .bard build over its JSON source unless the JSON
+    was modified after it (e.g. edited by hand), in which case the JSON is listed. That is
+    reported once per edit, not on every call (Bard lists the library each menu loop).
+    """
+    songs = {}
+    paths = glob.glob(os.path.join(songs_dir, "*.json")) + glob.glob(os.path.join(songs_dir, "*" + SongFormat.BINARY_EXT))
+    for path in paths:
+        songs.setdefault(os.path.splitext(path)[0], {})[os.path.splitext(path)[1]] = path
+    listed = []
+    for stem, found in songs.items():
+        bard_path, json_path = found.get(SongFormat.BINARY_EXT), found.get(".json")
+        json_mtime = os.stat(json_path).st_mtime_ns if bard_path and json_path else None
+        if json_mtime is not None and os.stat(bard_path).st_mtime_ns < json_mtime:
+            if (json_path, json_mtime) not in _warned_stale:
+                print(f"[!] {json_path} is newer than its {SongFormat.BINARY_EXT} build; using the JSON (run Songwriter.py to rebuild)")
+                _warned_stale.add((json_path, json_mtime))
+            bard_path = None
+        listed.append(bard_path or json_path)
+    return sorted(listed)
+
+def song_meta(song_data):
+    """Index fields for a JSON-style song dict."""
+    bpm = song_data.get('bpm', 120)
+    return {
+        "title": song_data.get('title', 'Unknown'),
+        "bpm": bpm,
+        "duration": SongFormat.song_beats(song_data) * (60.0 / bpm),
+        "events": SongFormat.song_events(song_data),
+    }
+
+def read_meta(path, raw):
+    """Index fields for the raw bytes of a song file."""
+    if path.endswith(SongFormat.BINARY_EXT):
+        header = SongFormat.HEADER.unpack_from(raw, 0)
+        magic, version, bpm, count, total_beats, duration, title_len = header
+        if magic != SongFormat.MAGIC: raise ValueError("not a .bard file")
+        start = SongFormat.HEADER.size
+        return {"title": raw[start:start + title_len].decode('utf-8'), "bpm": bpm, "duration": duration, "events": count}
+    return song_meta(json.loads(raw))
+
+class LibraryIndex:
+    """
+    Song metadata cache stored as <songs_dir>/.library.json.
+    Entries are keyed on path and carry the mtime_ns/size they were read at.
+    """
+    def __init__(self, songs_dir=SONGS_DIR):
+        self.songs_dir = songs_dir
+        self.path = os.path.join(songs_dir, INDEX_NAME)
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+            if stored.get("version") == INDEX_VERSION: self.entries = stored.get("songs", {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        if not self.dirty: return
+        if not os.path.exists(self.songs_dir): os.makedirs(self.songs_dir)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"version": INDEX_VERSION, "songs": self.entries}, f, indent=1)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def lookup(self, path):
+        """Returns the entry for path, re-reading the file only if its mtime or size changed."""
+        key = os.path.normpath(path)
+        st = os.stat(path)
+        entry = self.entries.get(key)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return entry
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        try:
+            entry = read_meta(path, raw)
+        except Exception as e:
+            entry = {"error": str(e)}
+        entry.update(mtime_ns=st.st_mtime_ns, size=st.st_size, hash=content_hash(raw))
+        self.entries[key] = entry
+        self.dirty = True
+        return entry
+
+    def register(self, path, meta, digest):
+        """Records a file that was just written, without reading it back."""
+        st = os.stat(path)
+        self.entries[os.path.normpath(path)] = dict(meta, mtime_ns=st.st_mtime_ns, size=st.st_size, hash=digest)
+        self.dirty = True
+
+    def forget(self, path):
+        if self.entries.pop(os.path.normpath(path), None) is not None: self.dirty = True
+
+    def refresh(self):
+        """Returns [(path, entry)] for every song on disk and drops entries for deleted files."""
+        songs = [(path, self.lookup(path)) for path in list_song_files(self.songs_dir)]
+        for key in [k for k in self.entries if not os.path.exists(k)]:
+            self.forget(key)
+        self.save()
+        return songs
@@ -1,7 +1,29 @@
 """
 Songwriter.py
 Compiles composition modules into playable JSON files.
-Last Update: 2025-11-22 20:55 EST (v12.0 - Debug Mode)
+v13.0: Also emits a compact .bard build (see SongFormat.py) next to every JSON song.
+v13.1: Registers written songs in the shared library index (see SongLibrary.py).
+v14.0: Incremental builds. Compositions whose source, local imports and seed are unchanged
+       are not executed; outputs are compared by hash instead of reloading the JSON.
+v14.1: --jobs N compiles compositions in worker processes. Output is identical to a serial
+       build and is reported in file order; a failing file only takes itself down.
+v14.2: Streaming writer. 'notes' may be a generator; instructions are written to the JSON
+       and .bard outputs as they are produced instead of being held in memory.
+v14.3: Multi-track songs: the .bard build and reported length cover every track, merged
+       with SongFormat.merge_tracks, not just Lead_Melody.
+v14.4: Peephole optimizer. Rests fold into the strike before them (so modifiers stay held
+       across them) and identical strikes collapse into run-length entries.
+       --no-optimize writes the instructions exactly as composed.
+v14.5: Playability analysis against Bard's PRESS_DURATION/MOD_LEAD_TIME budgets. Strikes
+       too fast to play are reported per section; --reflow thins them, --strict fails them.
+v14.6: Structured output. A song whose notes are a MusicUtils.Block is written with its
+       shared and repeated segments as SongFormat sections instead of unrolled.
+v14.7: compose(rng) receives a MusicUtils.RandomStreams named after the composition; the
+       global 'random' is still seeded the same way for compose() without arguments.
+v14.8: --watch keeps the Songwriter running and rebuilds compositions as they are saved.
+       Changed local modules (e.g. MusicUtils.py) are reloaded in-process, and only the
+       compositions that depend on them are recompiled.
+Last Update: 2026-10-17
 """
 import os
 import json
@@ -9,81 +31,541 @@ import importlib.util
 import sys
 import random 
 import glob
+import ast
+import argparse
+import io
+import contextlib
+import traceback
+import hashlib
+import inspect
+import importlib
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import SongFormat
+import SongLibrary
+import MusicUtils
+from SongFormat import PRESS_DURATION, MOD_LEAD_TIME, TRACE_SECTION_SEC
 
 # CONFIG
 COMPOSITIONS_DIR = "compositions"
 OUTPUT_DIR = "songs"
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUILD_CACHE_NAME = ".build_cache.json"
+BUILD_CACHE_VERSION = 5     # Bump when the same inputs should produce different output
+DEFAULT_OPTIONS = {"optimize": True, "reflow": False, "strict": False}
+WATCH_POLL_SEC = 0.2        # How often --watch checks for saved files
+MIN_SECTION_INSTRUCTIONS = 4    # Shorter shared blocks are written inline
+
+class BuildError(ValueError):
+    """A song the build refuses to write; reported as one line, without a traceback."""
 
 def ensure_output_dir():
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
         print(f"[+] Created '{OUTPUT_DIR}' folder.")
 
-def get_duration_str(song_data):
-    """Calculates formatted duration (MM:SS) from song data."""
-    bpm = song_data.get('bpm', 120)
-    notes = song_data.get('notes', [])
-    
-    # Handle legacy multi-track if necessary
-    if not notes and 'tracks' in song_data:
-         notes = song_data['tracks'].get('Lead_Melody', [])
-
-    if not notes:
-        return "00:00"
-
-    total_beats = sum(instruction[-1] for instruction in notes)
-    total_seconds = total_beats * (60.0 / bpm)
-    
+def format_duration(total_seconds):
     m = int(total_seconds // 60)
     s = int(total_seconds % 60)
     return f"{m:02d}:{s:02d}"
 
-def save_song(filename, song_data):
+# ==========================================
+# OPTIMIZER
+# ==========================================
+# Bard taps every strike, so a song is fully described by its strike onsets,
+# their notes and the modifier held under each strike. Rests and the
+# modifiers written on them are silent, which leaves room for two rewrites:
+#   1. A rest folds into the instruction before it. Back-to-back rests become
+#      one, and a modifier shared by the strikes around a rest stays latched
+#      instead of being released and pressed again.
+#   2. Consecutive identical strikes become one run-length entry
+#      [notes, modifier, duration, count].
+# Both passes stream, holding one instruction of lookbehind.
+
+def fold_rests(instructions):
+    """Merges every rest into the instruction before it. Only a leading rest survives."""
+    pending = None
+    for instruction in SongFormat.expand_runs(instructions):
+        notes, modifier, duration = SongFormat.parse_instruction(instruction)
+        rest = all(n == "REST" for n in notes)
+        if rest and pending is not None:
+            pending[2] = round(pending[2] + duration, 9)
+            continue
+        if pending is not None: yield pending
+        pending = [["REST"], None, duration] if rest else [list(notes), modifier, duration]
+    if pending is not None: yield pending
+
+def run_length(instructions):
+    """Collapses consecutive identical [notes, modifier, duration] strikes into run-length entries."""
+    run, count = None, 0
+    for instruction in instructions:
+        if instruction == run:
+            count += 1
+            continue
+        if run is not None: yield run_entry(run, count)
+        run, count = instruction, 1
+    if run is not None: yield run_entry(run, count)
+
+def run_entry(strike, count):
+    notes, modifier, duration = strike
+    if count > 1: return [notes, modifier, duration, count]
+    return [notes, modifier, duration] if modifier else [notes, duration]
+
+def modifier_presses(instructions, stats, key):
+    """Validates instructions and counts them and their modifier presses (as Bard latches them) into stats[key]."""
+    held = None
+    for instruction in instructions:
+        modifier = SongFormat.check_instruction(instruction)[1]
+        if modifier and modifier != held: stats[key]["presses"] += 1
+        held = modifier
+        stats[key]["events"] += 1
+        yield instruction
+
+def report_optimizer(stats):
+    before, after = stats["before"], stats["after"]
+    if not before["events"]: return
+    removed = before["events"] - after["events"]
+    print(f"[i] Optimizer: {before['events']} -> {after['events']} instructions ({removed / before['events']:.0%} removed), "
+          f"modifier presses {before['presses']} -> {after['presses']}")
+
+# ==========================================
+# PLAYABILITY
+# ==========================================
+# Bard holds every strike for PRESS_DURATION and presses a modifier
+# MOD_LEAD_TIME before the strike that needs it, whatever the tempo. The gap
+# between two strikes therefore has to fit the first one's tap plus the lead
+# of the second one's modifier, if it differs. Gaps that don't are squeezed
+# by the player (short taps, late modifiers) and the game may miss them.
+# "Projected drift" is how late a passage would run if every strike got its
+# full budget. --reflow thins such passages instead (see reflow()).
+
+ANALYSIS_SECTION_SEC = TRACE_SECTION_SEC
+REFLOW_WINDOW = 64      # Strikes held back so a too-fast run can give way to the strike after it
+
+def strike_budget(modifier, next_modifier):
+    """Seconds a strike needs before the next one can be played."""
+    if next_modifier and next_modifier != modifier: return PRESS_DURATION + MOD_LEAD_TIME
+    return PRESS_DURATION
+
+def is_rest(notes):
+    return all(n == "REST" for n in notes)
+
+def reflow(instructions, bpm, stats):
+    """
+    Thins strikes that can't be played in time. Expects fold_rests() output. A too-fast
+    repeat drops the repeats after it (a tremolo thins out); any other strike that is too
+    short for the one after it is merged into the strikes before it, so the strike that
+    lands a phrase survives and fast grace notes give way.
+    """
+    stats["reflowed"] = 0
+    beats_per_second = bpm / 60.0
+
+    def too_short(strike, next_modifier):
+        return strike[2] < strike_budget(strike[1], next_modifier) * beats_per_second - 1e-9
+
+    pending = deque()
+    for instruction in instructions:
+        if pending and not is_rest(pending[-1][0]):
+            if instruction[:2] != pending[-1][:2]:
+                while len(pending) > 1 and too_short(pending[-1], instruction[1]):
+                    merged = pending.pop()
+                    pending[-1][2] = round(pending[-1][2] + merged[2], 9)
+                    stats["reflowed"] += 1
+            if too_short(pending[-1], instruction[1]):
+                pending[-1][2] = round(pending[-1][2] + instruction[2], 9)
+                stats["reflowed"] += 1
+                continue
+        pending.append(instruction)
+        if len(pending) > REFLOW_WINDOW: yield pending.popleft()
+    yield from pending
+
+def analyze(instructions, bpm, stats):
+    """Passes instructions through, recording per section the strikes that don't fit their budget."""
+    stats.update(unplayable=0, sections={})
+    seconds_per_beat = 60.0 / bpm
+    beat = 0.0
+    last = None     # (onset in seconds, modifier) of the previous strike
+    for instruction in instructions:
+        notes, modifier, duration = SongFormat.parse_instruction(instruction)
+        count = SongFormat.run_count(instruction)
+        if is_rest(notes):
+            beat += duration * count
+            yield instruction
+            continue
+        for _ in range(count):
+            onset = beat * seconds_per_beat
+            if last is not None:
+                deficit = strike_budget(last[1], modifier) - (onset - last[0])
+                if deficit > 1e-9:
+                    section = stats["sections"].setdefault(int(last[0] // ANALYSIS_SECTION_SEC), [0, 0.0])
+                    section[0] += 1
+                    section[1] += deficit
+                    stats["unplayable"] += 1
+            last = (onset, modifier)
+            beat += duration
+        yield instruction
+
+def report_playability(stats):
+    if "reflowed" in stats and stats["reflowed"]:
+        print(f"[i] Reflow: {stats['reflowed']} strikes merged into the one before them")
+    if not stats["unplayable"]: return
+    drift = sum(deficit for _, deficit in stats["sections"].values())
+    print(f"[!] Unplayable: {stats['unplayable']} strikes need more time than their slot (projected drift +{drift:.3f}s)")
+    for index in sorted(stats["sections"]):
+        count, deficit = stats["sections"][index]
+        start = index * ANALYSIS_SECTION_SEC
+        print(f"    {format_duration(start)}-{format_duration(start + ANALYSIS_SECTION_SEC)}: {count} strikes, +{deficit:.3f}s")
+
+def play_passes(instructions, bpm, options, stats):
+    """The optimizer and playability passes every played instruction goes through."""
+    stats.update(before={"events": 0, "presses": 0}, after={"events": 0, "presses": 0})
+    stream = modifier_presses(instructions, stats, "before")
+    if options["optimize"] or options["reflow"]: stream = fold_rests(stream)
+    if options["reflow"]: stream = reflow(stream, bpm, stats)
+    if options["optimize"]: stream = run_length(stream)
+    return analyze(modifier_presses(stream, stats, "after"), bpm, stats)
+
+# ==========================================
+# SECTIONS
+# ==========================================
+# A MusicUtils.Block tree already says which material is shared: a block used
+# in more than one place, or repeated, becomes a SongFormat section and is
+# played with a reference, so the song is stored once per unique segment.
+# The optimizer runs inside each section body (references act as barriers)
+# and the playability analysis runs over the expanded song, as Bard plays it.
+# --reflow moves strikes across segment boundaries, so it writes flat songs.
+
+def lower_block(block):
+    """Splits a Block tree into ({name: entries}, song body entries). Sections are in dependency order."""
+    uses = {}
+    def count(node):
+        for part in node.parts:
+            if isinstance(part, MusicUtils.Block):
+                uses[id(part)] = uses.get(id(part), 0) + 1
+                if uses[id(part)] == 1: count(part)
+    count(block)
+
+    sections, names = {}, {}
+    def body(node):
+        entries = []
+        for part in node.parts:
+            if isinstance(part, MusicUtils.Block): entries.extend(reference(part))
+            else: entries.append([list(part[0]) if isinstance(part[0], tuple) else part[0], *part[1:]])
+        return entries
+
+    def reference(node):
+        shared = uses.get(id(node), 0) > 1 or node.times > 1
+        if not shared or len(node) // node.times < MIN_SECTION_INSTRUCTIONS: return body(node) * node.times
+        if id(node) not in names:
+            entries = body(node)
+            names[id(node)] = f"S{len(sections) + 1}"
+            sections[names[id(node)]] = entries
+        return [{"section": names[id(node)], "repeat": node.times} if node.times > 1 else {"section": names[id(node)]}]
+
+    return sections, reference(block)
+
+def optimize_body(entries):
+    """fold_rests() and run_length() over the instructions between section references."""
+    segment = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            segment.append(entry)
+            continue
+        yield from run_length(fold_rests(segment))
+        segment = []
+        yield entry
+    yield from run_length(fold_rests(segment))
+
+def lower_song(song_data, options):
+    """(sections, body entries) for a song worth writing structured, else None."""
+    notes = song_data.get('notes')
+    if options["reflow"] or not isinstance(notes, MusicUtils.Block): return None
+    sections, body = lower_block(notes)
+    if not sections: return None
+    if options["optimize"]:
+        sections = {name: list(optimize_body(entries)) for name, entries in sections.items()}
+        body = list(optimize_body(body))
+    return sections, body
+
+def section_passes(notes, body, sections, bpm, stats):
+    """play_passes() for a structured song: counts the composed notes, then analyses the expansion."""
+    stats.update(before={"events": 0, "presses": 0}, after={"events": 0, "presses": 0})
+    for _ in modifier_presses(notes, stats, "before"): pass
+    return analyze(modifier_presses(SongFormat.expand_sections(body, sections), stats, "after"), bpm, stats)
+
+def with_sections(song_data, sections):
+    """song_data with 'sections' placed just before 'notes'."""
+    out = {}
+    for key, value in song_data.items():
+        if key == 'notes': out['sections'] = sections
+        out[key] = value
+    return out
+
+# ==========================================
+# STREAMING WRITER
+# ==========================================
+# Songs are written as they are produced: 'notes' may be a generator (see the
+# iter_* helpers in MusicUtils), and each instruction goes to the JSON and
+# .bard outputs before the next one is generated. Output lands in .tmp files
+# that commit_song() promotes or discards by hash in the main process.
+
+def json_chunks(song_data, notes):
+    """
+    Yields the text of json.dumps(song_data, indent=2) piece by piece, taking the
+    'notes' value from the notes iterable one instruction at a time.
+    """
+    if not song_data:
+        yield "{}"
+        return
+    for k, (key, value) in enumerate(song_data.items()):
+        yield ("{\n  " if k == 0 else ",\n  ") + json.dumps(key) + ": "
+        if key != 'notes':
+            yield json.dumps(value, indent=2).replace("\n", "\n  ")
+            continue
+        empty = True
+        for instruction in notes:
+            yield ("[\n    " if empty else ",\n    ") + json.dumps(instruction, indent=2).replace("\n", "\n    ")
+            empty = False
+        yield "[]" if empty else "\n  ]"
+    yield "\n}"
+
+def stream_song(path, song_data, options=DEFAULT_OPTIONS):
+    """
+    Writes <path>.tmp (JSON) and the matching .bard.tmp while the song's notes are produced,
+    passing the played instructions through play_passes(). Block songs are written with
+    sections (see lower_song); multi-track songs are written merged, as 'notes'. With
+    options["strict"] a song with unplayable strikes raises BuildError instead.
+    Returns {"meta": library fields, "outputs": {output path: (tmp path, hash) or None}}.
+    """
+    bpm = song_data.get('bpm', 120)
+    title = song_data.get('title', 'Unknown')
+    structure = lower_song(song_data, options)
+    sections = structure[0] if structure else {}
+    bard_path = os.path.splitext(path)[0] + SongFormat.BINARY_EXT
+    bard = SongFormat.BinaryWriter(bard_path + ".tmp", title, bpm, song_data.get('markers'), list(sections))
+    stats = {"beats": 0.0, "events": 0}
+    passes = {}
+
+    def to_bard(method, *args):
+        nonlocal bard
+        if not bard: return
+        try:
+            getattr(bard, method)(*args)
+        except ValueError as e:
+            print(f"[!] No {SongFormat.BINARY_EXT} build for {title}: {e}")
+            bard.abort()
+            bard = None
+
+    def tally(instructions):
+        for instruction in instructions:
+            stats["beats"] += SongFormat.instruction_beats(instruction)
+            stats["events"] += SongFormat.run_count(instruction)
+            yield instruction
+
+    def played(instructions):
+        # Tee every instruction Bard will play into the .bard build and the stats
+        for instruction in tally(play_passes(instructions, bpm, options, passes)):
+            to_bard("add", instruction)
+            yield instruction
+
+    def structured(body):
+        # The .bard build gets the same sections and references as the JSON
+        for name, entries in sections.items(): to_bard("add_section", name, entries)
+        for entry in body:
+            to_bard("add", entry)
+            yield entry
+        for _ in tally(section_passes(song_data['notes'], body, sections, bpm, passes)): pass
+
+    hasher = hashlib.sha1()
+    merge = None
+    try:
+        with open(path + ".tmp", 'wb') as f:
+            if structure:
+                chunks = json_chunks(with_sections(song_data, sections), structured(structure[1]))
+            elif 'notes' in song_data:
+                chunks = json_chunks(song_data, played(song_data['notes']))
+            else:
+                # The JSON gets the merged, optimized notes too, so both outputs play the same
+                merge = {}
+                merged = {("notes" if key == 'tracks' else key): value for key, value in song_data.items() if key != 'sections'}
+                chunks = json_chunks(merged, played(SongFormat.song_notes(song_data, merge)))
+            for chunk in chunks:
+                data = chunk.encode('utf-8')
+                hasher.update(data)
+                f.write(data)
+        if merge is not None:
+            print(f"[i] Merged {merge['tracks']} tracks: {merge['coalesced']} strikes folded into chords, "
+                  f"{merge['dropped']} notes dropped on modifier conflicts")
+        if options["optimize"]: report_optimizer(passes)
+        if structure:
+            stored = len(structure[1]) + sum(len(entries) for entries in sections.values())
+            print(f"[i] Sections: {len(sections)} shared, {stored} entries stored for {passes['after']['events']} played")
+        report_playability(passes)
+        if options["strict"] and passes["unplayable"]: raise BuildError("unplayable passages (use --reflow to thin them)")
+    except Exception:
+        if bard: bard.abort()
+        os.remove(path + ".tmp")
+        raise
+
+    outputs = {path: (path + ".tmp", hasher.hexdigest()), bard_path: None}
+    if bard:
+        bard.close()
+        outputs[bard_path] = (bard.path, file_hash(bard.path))
+
+    meta = {"title": title, "bpm": bpm, "duration": stats["beats"] * (60.0 / bpm), "events": stats["events"]}
+    return {"meta": meta, "outputs": outputs}
+
+def commit_song(filename, build, library):
+    """
+    Promotes the .tmp outputs of a build that differ from the library's recorded hashes
+    and discards the rest. Returns {output path: hash}.
+    """
     path = os.path.join(OUTPUT_DIR, filename)
-    duration_str = get_duration_str(song_data)
+    meta = build["meta"]
+    title = meta["title"]
+    duration_str = format_duration(meta["duration"])
     
     # Check status before writing
-    if os.path.exists(path):
-        try:
-            with open(path, 'r') as f:
-                existing_data = json.load(f)
-            
-            if existing_data == song_data:
-                print(f"[=] Skipped (Unchanged): {song_data.get('title', filename)} [{duration_str}]")
-                return
-            
-            status_msg = "[~] Overwrote"
-        except Exception as e:
-            status_msg = f"[!] Fixed Corrupt File ({e})"
+    if not os.path.exists(path): status_msg = "[+] Created"
+    elif "error" in library.lookup(path): status_msg = f"[!] Fixed Corrupt File ({library.lookup(path)['error']})"
+    else: status_msg = "[~] Overwrote"
+
+    hashes = {}
+    changed = False
+    unchanged = []
+    for out_path, output in build["outputs"].items():
+        if output is None:
+            if os.path.exists(out_path): os.remove(out_path)
+            library.forget(out_path)
+            continue
+
+        tmp_path, digest = output
+        hashes[out_path] = digest
+        if os.path.exists(out_path) and library.lookup(out_path).get("hash") == digest:
+            os.remove(tmp_path)
+            unchanged.append(out_path)
+            continue
+
+        os.replace(tmp_path, out_path)
+        library.register(out_path, meta, digest)
+        changed = True
+
+    # Outputs of one build share a timestamp, so the library never takes a
+    # current .bard for one that is older than its JSON (see list_song_files)
+    newest = max((os.stat(p).st_mtime_ns for p in hashes), default=0)
+    for out_path in unchanged:
+        if os.stat(out_path).st_mtime_ns < newest:
+            os.utime(out_path, ns=(newest, newest))
+            library.register(out_path, meta, hashes[out_path])
+
+    if changed:
+        print(f"{status_msg}: {title} [{duration_str}] -> {path}")
     else:
-        status_msg = "[+] Created"
-    
-    # Write file
-    with open(path, 'w') as f:
-        json.dump(song_data, f, indent=2)
-    
-    print(f"{status_msg}: {song_data.get('title', filename)} [{duration_str}] -> {path}")
+        print(f"[=] Skipped (Unchanged): {title} [{duration_str}]")
+    return hashes
 
-def load_and_compile():
-    print(f"\nScanning '{COMPOSITIONS_DIR}/' for tracks...\n")
-    
-    if not os.path.exists(COMPOSITIONS_DIR):
-        os.makedirs(COMPOSITIONS_DIR)
-        print(f"Created '{COMPOSITIONS_DIR}' folder.")
-        return
+# ==========================================
+# BUILD CACHE
+# ==========================================
+# A composition is only imported and executed again when its own source, a
+# local module it imports (e.g. MusicUtils.py), its seed or the build version
+# changed, or when one of its outputs no longer matches the recorded hash.
 
-    files = [f for f in os.listdir(COMPOSITIONS_DIR) if f.endswith('.py') and not f.startswith('__')]
-    
-    if not files:
-        print("No composition files found.")
-        return
+def file_hash(path):
+    hasher = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
 
-    for filename in files:
-        module_name = filename[:-3]
-        file_path = os.path.join(COMPOSITIONS_DIR, filename)
-        
+def imported_modules(path):
+    """Top-level module names imported by a source file."""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import): names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level: names.add(node.module.split('.')[0])
+    return names
+
+def find_local_module(name):
+    for folder in (COMPOSITIONS_DIR, ENGINE_DIR):
+        path = os.path.join(folder, name + ".py")
+        if os.path.exists(path): return path
+    return None
+
+class BuildCache:
+    """Per-composition input/output hashes, stored as <output_dir>/.build_cache.json."""
+    def __init__(self, output_dir=OUTPUT_DIR):
+        self.path = os.path.join(output_dir, BUILD_CACHE_NAME)
+        self.entries = {}
+        self.hashes = {}
         try:
-            # CRITICAL: SEED THE RANDOMNESS
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+            if stored.get("version") == BUILD_CACHE_VERSION: self.entries = stored.get("compositions", {})
+        except (OSError, ValueError):
+            pass
+
+    def local_hash(self, path):
+        if path not in self.hashes: self.hashes[path] = file_hash(path)
+        return self.hashes[path]
+
+    def dependencies(self, file_path):
+        """{module name: hash} for every local module reachable from file_path's imports."""
+        deps = {}
+        pending = [file_path]
+        seen = {os.path.abspath(file_path)}
+        while pending:
+            for name in sorted(imported_modules(pending.pop())):
+                dep_path = find_local_module(name)
+                if dep_path is None or os.path.abspath(dep_path) in seen: continue
+                seen.add(os.path.abspath(dep_path))
+                deps[name] = self.local_hash(dep_path)
+                pending.append(dep_path)
+        return deps
+
+    def inputs_for(self, file_path, seed, options=DEFAULT_OPTIONS):
+        """Everything that determines a composition's output, or None if it can't be determined."""
+        try:
+            return {"source": file_hash(file_path), "deps": self.dependencies(file_path), "seed": seed, "options": options}
+        except (OSError, SyntaxError, ValueError):
+            return None
+
+    def is_fresh(self, filename, inputs, library):
+        entry = self.entries.get(filename)
+        if inputs is None or not entry or entry["inputs"] != inputs: return False
+        for out_path, digest in entry["outputs"].items():
+            if not os.path.exists(out_path) or library.lookup(out_path).get("hash") != digest: return False
+        return True
+
+    def record(self, filename, inputs, outputs):
+        if inputs is None: self.entries.pop(filename, None)
+        else: self.entries[filename] = {"inputs": inputs, "outputs": outputs}
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"version": BUILD_CACHE_VERSION, "compositions": self.entries}, f, indent=1)
+        os.replace(tmp, self.path)
+
+def compile_composition(file_path, options=DEFAULT_OPTIONS):
+    """
+    Imports a composition, runs compose() under the standard seed and streams the
+    song to .tmp outputs. Runs the same way in-process and in a worker, so both
+    produce identical songs. Returns (build or None, captured console output).
+    """
+    filename = os.path.basename(file_path)
+    module_name = filename[:-3]
+    build = None
+    log = io.StringIO()
+
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            # CRITICAL: SEED THE RANDOMNESS (compositions that still draw from the global 'random')
             random.seed(module_name)
             
             spec = importlib.util.spec_from_file_location(module_name, file_path)
@@ -92,12 +574,13 @@ def load_and_compile():
             spec.loader.exec_module(module)
             
             if hasattr(module, 'compose'):
-                song_data = module.compose()
+                # compose(rng) gets its own named streams instead
+                if inspect.signature(module.compose).parameters: result = module.compose(MusicUtils.RandomStreams(module_name))
+                else: result = module.compose()
                 
                 # Check for BOTH single-track ('notes') or multi-track ('tracks') content
-                if 'title' in song_data and ('notes' in song_data or 'tracks' in song_data):
-                    json_name = filename.replace(".py", ".json")
-                    save_song(json_name, song_data)
+                if 'title' in result and ('notes' in result or 'tracks' in result):
+                    build = stream_song(os.path.join(OUTPUT_DIR, module_name + ".json"), result, options)
                 else:
                     print(f"[!] Error in {filename}: Returned dictionary is missing required 'title', 'notes', or 'tracks' keys.")
             else:
@@ -105,15 +588,231 @@ def load_and_compile():
                 print(f"[-] Skipped {filename}: No compose() function found.")
                 print(f"    Debug: This file contains: {[d for d in dir(module) if not d.startswith('__')]}")
                 
+        except BuildError as e:
+            print(f"[!] Failed to compile {filename}: {e}")
         except Exception as e:
             print(f"[!] Failed to compile {filename}: {e}")
-            import traceback
             traceback.print_exc()
 
+    return build, log.getvalue()
+
+def run_isolated(fn, items, jobs, *args):
+    """
+    Yields (item, result, error) for fn(item, *args) in the order of items, where error is
+    the traceback if the call raised or its worker died. With jobs > 1 items run in a process
+    pool. A dying worker breaks the whole pool, so the items that were still pending are run
+    again one process each, and only the one that crashed reports an error.
+    """
+    def attempt(call):
+        try:
+            return call(), None
+        except Exception:
+            return None, traceback.format_exc()
+
+    if jobs <= 1 or len(items) <= 1:
+        for item in items:
+            yield (item, *attempt(lambda: fn(item, *args)))
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(fn, item, *args) for item in items]
+        for done, (item, future) in enumerate(zip(items, futures)):
+            if isinstance(future.exception(), BrokenProcessPool): break
+            yield (item, *attempt(future.result))
+        else:
+            return
+
+    for item, future in zip(items[done:], futures[done:]):
+        if not isinstance(future.exception(), BrokenProcessPool):
+            yield (item, *attempt(future.result))
+            continue
+        with ProcessPoolExecutor(max_workers=1) as solo:
+            yield (item, *attempt(solo.submit(fn, item, *args).result))
+
+def discard_tmp(paths):
+    """Removes the .tmp outputs a crashed worker left behind."""
+    for path in paths:
+        if os.path.exists(path + ".tmp"): os.remove(path + ".tmp")
+
+def compile_all(paths, jobs, options=DEFAULT_OPTIONS):
+    """
+    Yields (path, build, log) in the order of paths. With jobs > 1 compositions run in a
+    process pool; a worker that dies only fails its own file (see run_isolated).
+    """
+    for path, result, error in run_isolated(compile_composition, paths, jobs, options):
+        if error is None:
+            yield (path, *result)
+            continue
+        module_name = os.path.basename(path)[:-3]
+        discard_tmp(os.path.join(OUTPUT_DIR, module_name + ext) for ext in (".json", SongFormat.BINARY_EXT))
+        yield path, None, f"[!] Failed to compile {os.path.basename(path)}: worker crashed\n{error}"
+
+def composition_files():
+    return sorted(f for f in os.listdir(COMPOSITIONS_DIR) if f.endswith('.py') and not f.startswith('__'))
+
+def rebuild(library, cache, force=False, jobs=1, options=DEFAULT_OPTIONS, timed=False):
+    """
+    Compiles every composition whose inputs changed and commits its songs.
+    timed (watch mode) reports each file's compile latency instead of listing fresh ones.
+    Returns the number of compositions compiled.
+    """
+    cache.hashes.clear()
+    pending = {}
+    fresh = {}      # file_path -> its "Up to date" line, printed in file order with the compiled ones
+    order = []
+
+    for filename in composition_files():
+        module_name = filename[:-3]
+        file_path = os.path.join(COMPOSITIONS_DIR, filename)
+        order.append(file_path)
+
+        inputs = cache.inputs_for(file_path, module_name, options)
+        if not force and cache.is_fresh(filename, inputs, library):
+            if timed: continue
+            meta = library.lookup(os.path.join(OUTPUT_DIR, module_name + ".json"))
+            fresh[file_path] = f"[=] Up to date: {meta.get('title', filename)} [{format_duration(meta.get('duration', 0))}]"
+            continue
+        pending[file_path] = inputs
+
+    listing = iter(order)
+    started = time.perf_counter()
+    for file_path, build, log in compile_all(list(pending), jobs, options):
+        for earlier in listing:
+            if earlier == file_path: break
+            if earlier in fresh: print(fresh[earlier])
+        print(log, end="")
+        filename = os.path.basename(file_path)
+        if build is not None:
+            json_name = filename.replace(".py", ".json")
+            cache.record(filename, pending[file_path], commit_song(json_name, build, library))
+        if timed:
+            now = time.perf_counter()
+            print(f"[i] {filename}: {(now - started) * 1e3:.0f} ms")
+            started = now
+    for earlier in listing:
+        if earlier in fresh: print(fresh[earlier])
+
+    library.save()
+    cache.save()
+    return len(pending)
+
+def load_and_compile(force=False, jobs=1, options=DEFAULT_OPTIONS):
+    print(f"\nScanning '{COMPOSITIONS_DIR}/' for tracks...\n")
+    
+    if not os.path.exists(COMPOSITIONS_DIR):
+        os.makedirs(COMPOSITIONS_DIR)
+        print(f"Created '{COMPOSITIONS_DIR}' folder.")
+        return
+
+    if not composition_files():
+        print("No composition files found.")
+        return
+
+    rebuild(SongLibrary.LibraryIndex(OUTPUT_DIR), BuildCache(OUTPUT_DIR), force, jobs, options)
+
+# ==========================================
+# WATCH MODE
+# ==========================================
+# --watch polls the compositions and the local modules they import. A saved
+# composition is simply compiled again (compile_composition always executes
+# a fresh module). A saved local module is reloaded in place first, so the
+# compositions that import it see the new code; the build cache then picks
+# out exactly the compositions whose dependencies changed.
+
+def stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+class Watcher:
+    """Polls the compositions and the local modules they import. Imports are re-read only after a change."""
+    def __init__(self, cache):
+        self.cache = cache
+        self.deps = {}          # composition path -> paths of the local modules it imports
+        self.stamps = self.scan()
+
+    def imports(self, path):
+        if path not in self.deps:
+            try:
+                self.deps[path] = [p for p in map(find_local_module, self.cache.dependencies(path)) if p]
+            except (OSError, SyntaxError, ValueError):
+                return []       # Mid-save or broken: only its own mtime is watched for now
+        return self.deps[path]
+
+    def scan(self):
+        stamps = {}
+        for path in (os.path.abspath(os.path.join(COMPOSITIONS_DIR, f)) for f in composition_files()):
+            stamps[path] = stamp(path)
+            for dep in self.imports(path): stamps[os.path.abspath(dep)] = stamp(dep)
+        return stamps
+
+    def modules(self, paths=None):
+        """The local modules (not compositions) among paths, by default everything watched."""
+        compositions = {os.path.abspath(os.path.join(COMPOSITIONS_DIR, f)) for f in composition_files()}
+        return set(self.stamps if paths is None else paths) - compositions
+
+    def changes(self):
+        """Paths added, removed or saved since the last call."""
+        current = self.scan()
+        changed = {path for path in current.keys() | self.stamps.keys() if current.get(path) != self.stamps.get(path)}
+        if changed:
+            self.deps.clear()
+            self.cache.hashes.clear()
+            current = self.scan()
+        self.stamps = current
+        return changed
+
+def reload_modules(paths):
+    """Reloads the already-imported local modules among paths. Returns their names."""
+    reloaded = []
+    for name, module in list(sys.modules.items()):
+        source = getattr(module, '__file__', None)
+        if name == '__main__' or not source or os.path.abspath(source) not in paths: continue
+        try:
+            importlib.reload(module)
+            reloaded.append(name)
+        except Exception as e:
+            print(f"[!] Failed to reload {name}: {e}")
+    return reloaded
+
+def watch(options=DEFAULT_OPTIONS):
+    library = SongLibrary.LibraryIndex(OUTPUT_DIR)
+    cache = BuildCache(OUTPUT_DIR)
+    watcher = Watcher(cache)
+    print(f"\n[i] Watching '{COMPOSITIONS_DIR}/' and {len(watcher.modules())} local module(s). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(WATCH_POLL_SEC)
+            changed = watcher.changes()
+            if not changed: continue
+
+            started = time.perf_counter()
+            print(f"\n[~] Changed: {', '.join(sorted(os.path.basename(p) for p in changed))}")
+            for name in reload_modules(watcher.modules(changed)): print(f"[i] Reloaded {name}")
+            if rebuild(library, cache, options=options, timed=True):
+                print(f"[i] Rebuilt in {(time.perf_counter() - started) * 1e3:.0f} ms")
+            else:
+                print("[=] Nothing to rebuild.")
+    except KeyboardInterrupt:
+        print("\n[i] Stopped watching.")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compiles compositions into playable songs.")
+    parser.add_argument("--force", action="store_true", help="rebuild every composition, ignoring the build cache")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="compile in N worker processes (0 = one per CPU)")
+    parser.add_argument("--no-optimize", action="store_true", help="write instructions exactly as composed, without the peephole optimizer")
+    parser.add_argument("--reflow", action="store_true", help="thin passages too fast for Bard's press/modifier timing")
+    parser.add_argument("--strict", action="store_true", help="fail songs that still have unplayable passages")
+    parser.add_argument("--watch", action="store_true", help="keep running and rebuild compositions (in-process) whenever they or MusicUtils.py are saved")
+    args = parser.parse_args()
+    options = {"optimize": not args.no_optimize, "reflow": args.reflow, "strict": args.strict}
+
     print("========================================")
     print("   WWM SONGWRITER ENGINE")
     print("========================================")
     ensure_output_dir()
-    load_and_compile()
-    print("\nDone! Run 'Bard.py' to play.")
\ No newline at end of file
+    load_and_compile(force=args.force, jobs=args.jobs or os.cpu_count(), options=options)
+    if args.watch: watch(options)
+    print("\nDone! Run 'Bard.py' to play.")
@@ -7,6 +7,8 @@ v9.1: THE EXTENDED CUT (Smart Hand Optimized).
       - Arrangement: Verses (4 cycles), Bridge, Grand Chorus.
       - Verified for Bard v19.1 (Rest Safe).
       - Target: ~1:50 | BPM: 96
+v9.2: Arrangement built with utils.arrange(), so every section is a seek marker.
+v9.3: Built from shared utils.Block segments; riffs and techniques are made once and reused.
 Last Update: 2025-11-23 15:15 EST
 """
 import MusicUtils as utils
@@ -17,8 +19,6 @@ def compose():
     BPM = 96 
     SCALE = utils.SCALES["YU"] 
     
-    track = []
-
     # ==========================================
     # THE RIFF (Fixed to 8 Beats / 2 Bars)
     # ==========================================
@@ -36,132 +36,110 @@ def compose():
         (["L7"], 0.5), (["L5"], 0.5)  
     ]
 
-    full_riff = riff_head + riff_tail 
+    full_riff = utils.Block(riff_head, riff_tail)
+
+    # Heavy Riff: the low L6 doubled with L2
+    heavy_riff = utils.Block(
+        instruction if instruction[0] == ["REST"] else
+        ((["L2", "L6"] if "L6" in instruction[0] else instruction[0]), instruction[1])
+        for instruction in full_riff
+    )
 
     # ==========================================
     # SECTIONS
     # ==========================================
 
     def section_intro():
-        t = []
-        t.extend(utils.rest(0.5))
-        t.extend(utils.dynamic_tremolo(["L2", "L6"], duration=4.0, start_speed=0.12, end_speed=0.08))
-        t.extend(utils.ornament("M4", duration=1.0, type="trill")) 
-        t.extend(utils.slide("M4", "M3", 1.0))
-        return t
+        return utils.Block(
+            utils.block_rest(0.5),
+            utils.block_dynamic_tremolo(["L2", "L6"], duration=4.0, start_speed=0.12, end_speed=0.08),
+            utils.block_ornament("M4", duration=1.0, type="trill"),
+            utils.block_slide("M4", "M3", 1.0),
+        )
 
     def section_verse_extended(style='standard'):
-        t = []
-        
-        # 1. Base Riff
-        t.extend(full_riff)
-        t.extend(full_riff)
-        
-        # 2. Heavy Riff
-        heavy = []
-        for instruction in full_riff:
-            notes = instruction[0]
-            if notes == ["REST"]: 
-                heavy.append(instruction)
-                continue
-            
-            if "L6" in notes: notes = ["L2", "L6"]
-            heavy.append((notes, instruction[1]))
-            
+        # 1. Base Riff, 2. Heavy Riff
         if style == 'mute':
-            t.extend(utils.style_apply(heavy, 'mute'))
-            t.extend(utils.style_apply(heavy, 'mute'))
-        else:
-            t.extend(heavy)
-            t.extend(heavy)
-            
-        return t
+            return utils.Block(full_riff * 2, utils.style_apply(heavy_riff, 'mute'), utils.style_apply(heavy_riff, 'mute'))
+        return utils.Block(full_riff * 2, heavy_riff * 2)
 
     def section_pre_chorus():
-        t = []
-        t.extend(utils.chug(["L6", "M1"], 4, 0.5)) 
-        t.extend(utils.strum(["M1", "M3", "M4"], 2.0, 0.05)) 
-        t.extend(utils.slide("M4", "M3", 0.5)) 
-        t.extend(utils.strum(["M2", "M5"], 1.5, 0.05))
-        return t
+        return utils.Block(
+            utils.block_chug(["L6", "M1"], 4, 0.5),
+            utils.block_strum(["M1", "M3", "M4"], 2.0, 0.05),
+            utils.block_slide("M4", "M3", 0.5),
+            utils.block_strum(["M2", "M5"], 1.5, 0.05),
+        )
+
+    progression = [
+        (["L6", "M1", "M3"], 2.0), # Am
+        (["M1", "M3", "M5"], 2.0), # C
+        (["L5", "M2", "M5"], 4.0)  # G
+    ]
+    strummed = utils.Block(*(utils.block_strum(chord, duration=dur, speed=0.05) for chord, dur in progression))
+    arpeggiated = utils.Block(*(
+        utils.block_arpeggio(chord, note_duration=0.2, direction='up') +
+        (utils.block_strum(chord, dur - len(chord) * 0.2, 0.05) if dur - len(chord) * 0.2 > 0 else [])
+        for chord, dur in progression
+    ))
 
     def section_chorus_grand(loops=2):
-        t = []
-        progression = [
-            (["L6", "M1", "M3"], 2.0), # Am
-            (["M1", "M3", "M5"], 2.0), # C
-            (["L5", "M2", "M5"], 4.0)  # G
-        ]
-        
-        for i in range(loops):
-            if i == 0 or i == 2: 
-                 for chord, dur in progression:
-                    t.extend(utils.strum(chord, duration=dur, speed=0.05))
-            else: 
-                 for chord, dur in progression:
-                    t.extend(utils.arpeggio(chord, note_duration=0.2, direction='up'))
-                    remain = dur - (len(chord)*0.2)
-                    if remain > 0: t.extend(utils.strum(chord, remain, 0.05))
-        return t
+        return utils.Block(*(strummed if i == 0 or i == 2 else arpeggiated for i in range(loops)))
 
     def section_bridge_atmospheric():
-        t = []
-        t.extend(utils.rest(0.5))
-        t.extend(utils.dynamic_tremolo(["L2"], 4.0, 0.2, 0.2)) 
-        
         melody = ["H1", "M6", "M4", "M3"]
-        for n in melody:
-            t.extend(utils.ornament(n, duration=1.5, type="vibrato"))
-            
-        t.extend(utils.slide("M3", "L6", 2.0))
-        return t
+        return utils.Block(
+            utils.block_rest(0.5),
+            utils.block_dynamic_tremolo(["L2"], 4.0, start_speed=0.2, end_speed=0.2),
+            *(utils.block_ornament(n, duration=1.5, type="vibrato") for n in melody),
+            utils.block_slide("M3", "L6", 2.0),
+        )
 
     def section_solo_extended():
-        t = []
-        
-        # 1. Fast Run
         scale_run = ["M1", "M3", "M5", "M6", "H1", "H2"]
-        t.extend(utils.arpeggio(scale_run, 0.15, 'up')) 
-        t.extend(utils.chug(["H2"], 4, 0.2))
-        
-        # 2. Bitter Bends
-        t.extend(utils.ornament("M3", 1.0, "trill"))
-        t.extend(utils.slide("M3", "M4", 0.5))
-        t.extend(utils.chug(["M4"], 4, 0.2)) 
-        
-        # 3. Tapping Finale
         tap_notes = ["H1", "M6", "H2", "M5"]
-        t.extend(utils.arpeggio(tap_notes, 0.12, 'random'))
-        t.extend(utils.arpeggio(tap_notes, 0.12, 'up'))
-        t.extend(utils.slide("M5", "L6", 2.0))
-        return t
+        return utils.Block(
+            # 1. Fast Run
+            utils.block_arpeggio(scale_run, 0.15, 'up'),
+            utils.block_chug(["H2"], 4, 0.2),
+            # 2. Bitter Bends
+            utils.block_ornament("M3", 1.0, "trill"),
+            utils.block_slide("M3", "M4", 0.5),
+            utils.block_chug(["M4"], 4, 0.2),
+            # 3. Tapping Finale
+            utils.block_arpeggio(tap_notes, 0.12, 'random'),
+            utils.block_arpeggio(tap_notes, 0.12, 'up'),
+            utils.block_slide("M5", "L6", 2.0),
+        )
 
     def section_outro_heavy():
-        t = []
-        high_notes = ["M3", "M4", "M3", "M1"] 
+        high_notes = ["M3", "M4", "M3", "M1"]
         low_notes = ["L6", "L2"]
-        
-        t.extend(utils.arpeggio(high_notes, 0.2, 'down'))
-        t.extend(utils.chug(low_notes, 4, 0.5))
-        t.extend(utils.arpeggio(high_notes, 0.15, 'random'))
-        t.extend(utils.strum(["L1", "L5", "L6"], 6.0, 0.15)) 
-        return t
+        return utils.Block(
+            utils.block_arpeggio(high_notes, 0.2, 'down'),
+            utils.block_chug(low_notes, 4, 0.5),
+            utils.block_arpeggio(high_notes, 0.15, 'random'),
+            utils.block_strum(["L1", "L5", "L6"], 6.0, 0.15),
+        )
 
     # ==========================================
     # ARRANGEMENT
     # ==========================================
-    track.extend(section_intro())
-    track.extend(section_verse_extended(style='standard'))
-    track.extend(section_pre_chorus())
-    track.extend(section_chorus_grand(loops=2))
-    track.extend(section_verse_extended(style='mute'))
-    track.extend(section_bridge_atmospheric())
-    track.extend(section_solo_extended())
-    track.extend(section_chorus_grand(loops=4))
-    track.extend(section_outro_heavy())
+    track, markers = utils.arrange(
+        ("Intro", section_intro()),
+        ("Verse", section_verse_extended(style='standard')),
+        ("Pre-Chorus", section_pre_chorus()),
+        ("Chorus", section_chorus_grand(loops=2)),
+        ("Verse 2", section_verse_extended(style='mute')),
+        ("Bridge", section_bridge_atmospheric()),
+        ("Solo", section_solo_extended()),
+        ("Grand Chorus", section_chorus_grand(loops=4)),
+        ("Outro", section_outro_heavy()),
+    )
     
     return {
         "title": TITLE,
         "bpm": BPM,
+        "markers": markers,
         "notes": track
     }
\ No newline at end of file
@@ -2,12 +2,13 @@
 template.py
 A blank canvas for the Jade Zither.
 v1.0: Initial Setup.
-Last Update: 2025-11-23
+v1.1: compose(rng): each section draws from its own named random stream.
+Last Update: 2026-10-17
 """
 import MusicUtils as utils
 import random
 
-def compose():
+def compose(rng):
     # --- CONFIGURATION ---
     TITLE = "Untitled Composition"
     BPM = 100 # Standard Adagio is ~90-100, Allegro ~120
@@ -36,9 +37,12 @@ def compose():
 
     def section_main():
         t = []
+        # Randomized helpers draw from this section's own stream, so editing
+        # another section never changes the variations chosen here.
+        section_rng = rng.section("Main")
         # Example: Play the theme, then play it with 'expressive' variations
-        t.extend(utils.style_apply(main_theme, 'standard', scale=CURRENT_SCALE))
-        t.extend(utils.style_apply(main_theme, 'expressive', scale=CURRENT_SCALE))
+        t.extend(utils.style_apply(main_theme, 'standard', scale=CURRENT_SCALE, rng=section_rng))
+        t.extend(utils.style_apply(main_theme, 'expressive', scale=CURRENT_SCALE, rng=section_rng))
         return t
 
     def section_climax():
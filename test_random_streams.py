@@ -0,0 +1,47 @@
+"""Sections built from RandomStreams come out the same serially, concurrently and from the block_* caches."""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import MusicUtils as utils
+
+MOTIF = [(["M1"], 0.5), (["M3", "M5"], "SHIFT", 0.5), (["REST"], 0.25), (["H1"], 1.0), (["L6"], 0.25)] * 20
+SECTIONS = [f"Section {i}" for i in range(32)]
+
+def build_section(name):
+    rng = utils.RandomStreams("Threaded").section(name)
+    motif = MOTIF
+    blocks = []
+    for _ in range(5):
+        motif = utils.block_develop_motif(motif, rng=rng)
+        blocks.append(motif)
+        blocks.append(utils.block_mutate_rhythm(motif, rng=rng))
+    return blocks, rng.random()
+
+def clear_caches():
+    utils.block_develop_motif.cache_clear()
+    utils.block_mutate_rhythm.cache_clear()
+
+def test_threads_match_serial_build():
+    clear_caches()
+    serial = [build_section(name) for name in SECTIONS]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)     # Switch threads often, so builds interleave
+    try:
+        for _ in range(3):
+            clear_caches()
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                threaded = list(pool.map(build_section, SECTIONS * 4))
+            assert threaded == serial * 4
+    finally:
+        sys.setswitchinterval(interval)
+
+def test_cache_hits_match_fresh_build():
+    clear_caches()
+    fresh = [build_section(name) for name in SECTIONS]
+    assert [build_section(name) for name in SECTIONS] == fresh
+    assert utils.block_develop_motif.cache_info().hits > 0
+
+def test_global_random_is_not_cached():
+    clear_caches()
+    for _ in range(10): utils.block_develop_motif(MOTIF)
+    assert utils.block_develop_motif.cache_info().currsize == 0